@@ -0,0 +1,248 @@
+import asyncio
+import sys
+import threading
+import numpy as np
+import ffmpeg
+from ffmpeg_stats import PROGRESS_ARGS, StderrMonitor
+
+
+def build_stream_args(url, width, height, **output_kwargs):
+    """Kamera akışı için ffmpeg komut satırını üret"""
+    return (
+        ffmpeg
+        .input(url, rtsp_transport='tcp', timeout=5000000)
+        .output('pipe:', format='rawvideo', pix_fmt='rgb24', s=f'{width}x{height}', **output_kwargs)
+        .global_args(*PROGRESS_ARGS)
+        .compile()
+    )
+
+
+def build_test_args(url, duration=3):
+    """Bağlantı testi için ffmpeg komut satırını üret"""
+    return (
+        ffmpeg
+        .input(url, rtsp_transport='tcp', timeout=5000000, t=duration)
+        .output('null', format='null')
+        .compile()
+    )
+
+
+def _use_pidfd_watcher(loop):
+    """Python 3.12 öncesinde varsayılan izleyici süreç başına bir thread açar; Linux'ta pidfd kullan"""
+    if sys.version_info >= (3, 12) or not sys.platform.startswith('linux'):
+        return
+    if not hasattr(asyncio, 'PidfdChildWatcher'):
+        return
+    try:
+        watcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(loop)
+        asyncio.set_child_watcher(watcher)
+    except (OSError, RuntimeError):
+        pass
+
+
+class AsyncStreamEngine:
+    """Tüm kamera pipe'larını, testleri ve yeniden başlatmaları tek bir olay döngüsünde çoklar.
+    Şimdilik yalnızca bench_streams.py kullanır; görüntüleyiciler kamera başına thread modelindedir."""
+
+    def __init__(self, restart_delay=2.0, max_restart_delay=30.0, read_timeout=None):
+        self.cameras = {}
+        # read_timeout saniye içinde tam kare gelmezse akış donmuş sayılır; ilk donmada hemen,
+        # art arda donmalarda artan beklemeyle yeniden başlatılır
+        self.read_timeout = read_timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.is_running = False
+        self.loop = None
+        self.thread = None
+
+    def add_camera(self, name, args, width, height, on_frame, on_status=None):
+        """Kamera ekle; on_frame(name, frame) her tam karede olay döngüsünden çağrılır"""
+        cam = {
+            "name": name,
+            "args": list(args),
+            "width": width,
+            "height": height,
+            "on_frame": on_frame,
+            "on_status": on_status,
+            "process": None,
+            "task": None,
+            "frame": None,
+            "frames": 0,
+            "restarts": 0,
+            "restart_now": False,
+            "timeouts": 0,
+            "monitor": StderrMonitor(None, name)
+        }
+        self.cameras[name] = cam
+        if self.is_running:
+            self.loop.call_soon_threadsafe(self._spawn, cam)
+        return cam
+
+    def remove_camera(self, name):
+        cam = self.cameras.pop(name, None)
+        if cam and self.is_running and cam["task"]:
+            self.loop.call_soon_threadsafe(cam["task"].cancel)
+
+    def start(self):
+        """Olay döngüsünü tek bir arka plan thread'inde başlat"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        for cam in list(self.cameras.values()):
+            self.loop.call_soon_threadsafe(self._spawn, cam)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        _use_pidfd_watcher(self.loop)
+        self.loop.run_forever()
+
+    def _spawn(self, cam):
+        cam["task"] = self.loop.create_task(self._run_camera(cam))
+
+    def _status(self, cam, message):
+        if cam["on_status"]:
+            cam["on_status"](cam["name"], message)
+
+    async def _run_camera(self, cam):
+        """Tek kameranın okuma döngüsü; akış koparsa artan beklemeyle yeniden başlatır"""
+        width, height = cam["width"], cam["height"]
+        frame_size = width * height * 3
+        delay = self.restart_delay
+
+        while self.is_running:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cam["args"],
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    limit=frame_size * 2
+                )
+            except OSError as e:
+                self._status(cam, f"Başlatma hatası: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_restart_delay)
+                continue
+
+            cam["process"] = process
+            stderr_task = self.loop.create_task(self._drain_stderr(process, cam["monitor"]))
+            self._status(cam, "Bağlandı")
+            try:
+                while self.is_running:
+                    data = await asyncio.wait_for(process.stdout.readexactly(frame_size), self.read_timeout)
+                    frame = np.frombuffer(data, np.uint8).reshape((height, width, 3))
+                    cam["frame"] = frame
+                    cam["frames"] += 1
+                    cam["on_frame"](cam["name"], frame)
+                    delay = self.restart_delay
+                    cam["timeouts"] = 0
+            except asyncio.TimeoutError:
+                self._status(cam, f"Donmuş akış: {self.read_timeout:g} sn kare gelmedi, yeniden bağlanıyor")
+                # Kare vermeden tekrar donan (ölü) kamera her read_timeout'ta yeniden bağlanmasın
+                cam["timeouts"] += 1
+                cam["restart_now"] = cam["timeouts"] == 1
+            except asyncio.IncompleteReadError:
+                last_error = cam["monitor"].snapshot()["last_error"]
+                self._status(cam, f"Akış sonlandı {last_error[:150]}")
+            except asyncio.CancelledError:
+                await self._terminate(process)
+                stderr_task.cancel()
+                raise
+            except Exception as e:
+                self._status(cam, f"Görüntü alma hatası: {e}")
+            await self._terminate(process)
+            stderr_task.cancel()
+            cam["process"] = None
+
+            if not self.is_running:
+                break
+            cam["restarts"] += 1
+            if cam["restart_now"]:
+                # İstenen yeniden başlatmada bekleme yok
+                cam["restart_now"] = False
+                continue
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_restart_delay)
+
+    async def _drain_stderr(self, process, monitor):
+        while True:
+            raw = await process.stderr.readline()
+            if not raw:
+                break
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                monitor.parse_line(line)
+
+    async def _terminate(self, process, timeout=2.0):
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), timeout)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    def restart_camera(self, name):
+        """Kameranın ffmpeg sürecini sonlandır; okuma döngüsü hemen yeniden bağlanır"""
+        cam = self.cameras.get(name)
+        if not cam or not self.is_running:
+            return
+
+        def _kill():
+            cam["restart_now"] = True
+            if cam["process"] and cam["process"].returncode is None:
+                cam["process"].terminate()
+        self.loop.call_soon_threadsafe(_kill)
+
+    async def _test_connection(self, args, timeout):
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await self._terminate(process)
+            return False, "Zaman aşımı"
+        if process.returncode == 0:
+            return True, "Bağlantı başarılı"
+        return False, stderr.decode('utf-8', errors='replace')[:150]
+
+    def test_connection(self, args, timeout=10.0):
+        """Bağlantı testini olay döngüsünde çalıştır; (başarılı, mesaj) döndüren Future verir"""
+        if not self.is_running:
+            raise RuntimeError("Motor çalışmıyor")
+        return asyncio.run_coroutine_threadsafe(self._test_connection(args, timeout), self.loop)
+
+    def stop(self):
+        """Tüm süreçleri kapat ve olay döngüsünü durdur"""
+        if not self.is_running:
+            return
+        self.is_running = False
+
+        async def _shutdown():
+            tasks = [cam["task"] for cam in self.cameras.values() if cam["task"]]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self.loop).result(timeout=5)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+        if not self.loop.is_running():
+            self.loop.close()
+        for cam in self.cameras.values():
+            cam["task"] = None
+            cam["process"] = None
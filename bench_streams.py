@@ -0,0 +1,194 @@
+import argparse
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import ffmpeg
+from async_engine import AsyncStreamEngine
+from decoders import available_backends, create_backend
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Sabit hızda ham RGB kare üreten sentetik kamera (ffmpeg gerektirmez)
+SYNTHETIC_PRODUCER = (
+    "import sys, time\n"
+    "w, h, fps = int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3])\n"
+    "frame = bytes(w * h * 3)\n"
+    "out = sys.stdout.buffer\n"
+    "period = 1.0 / fps\n"
+    "next_t = time.monotonic()\n"
+    "while True:\n"
+    "    out.write(frame)\n"
+    "    out.flush()\n"
+    "    next_t += period\n"
+    "    delay = next_t - time.monotonic()\n"
+    "    if delay > 0:\n"
+    "        time.sleep(delay)\n"
+    "    elif delay < -period:\n"
+    "        next_t = time.monotonic()\n"
+)
+
+
+def synthetic_command(width, height, fps, lavfi=False):
+    """Bir sentetik kamera için komut satırı üret"""
+    if lavfi:
+        return (
+            ffmpeg
+            .input(f'testsrc=size={width}x{height}:rate={fps}', format='lavfi', re=None)
+            .output('pipe:', format='rawvideo', pix_fmt='rgb24')
+            .global_args('-loglevel', 'error')
+            .compile()
+        )
+    return [sys.executable, '-c', SYNTHETIC_PRODUCER, str(width), str(height), str(fps)]
+
+
+def bench_threaded(commands, width, height, duration):
+    """Kamera başına bir thread'in stdout.read ile beklediği mevcut model"""
+    frame_size = width * height * 3
+    counts = [0] * len(commands)
+    stop = threading.Event()
+    processes = [
+        subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        for cmd in commands
+    ]
+
+    def reader(index, process):
+        while not stop.is_set():
+            data = process.stdout.read(frame_size)
+            if len(data) < frame_size:
+                break
+            np.frombuffer(data, np.uint8).reshape((height, width, 3))
+            counts[index] += 1
+
+    threads = [threading.Thread(target=reader, args=(i, p), daemon=True) for i, p in enumerate(processes)]
+    for thread in threads:
+        thread.start()
+
+    result = _measure(lambda: sum(counts), duration)
+    stop.set()
+    for process in processes:
+        process.kill()
+    for process in processes:
+        process.wait()
+    return result
+
+
+def bench_async(commands, width, height, duration):
+    """Tüm pipe'ları tek olay döngüsünde çoklayan asyncio motoru"""
+    engine = AsyncStreamEngine()
+    counts = [0]
+
+    def on_frame(name, frame):
+        counts[0] += 1
+
+    for i, cmd in enumerate(commands):
+        engine.add_camera(f"Kamera {i + 1}", cmd, width, height, on_frame)
+    engine.start()
+    result = _measure(lambda: counts[0], duration)
+    engine.stop()
+    return result
+
+
+def _measure(frame_counter, duration, warmup=1.0):
+    """Isınmadan sonra süre boyunca kare sayısını, CPU süresini ve thread sayısını ölç"""
+    time.sleep(warmup)
+    start_frames = frame_counter()
+    start_cpu = time.process_time()
+    start_wall = time.perf_counter()
+    time.sleep(duration)
+    frames = frame_counter() - start_frames
+    wall = time.perf_counter() - start_wall
+    cpu = time.process_time() - start_cpu
+    return {
+        "fps": frames / wall,
+        "cpu": 100.0 * cpu / wall,
+        "threads": threading.active_count()
+    }
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def bench_decoder(backend_name, count, width, height, duration, url=None):
+    """Çözücü arka ucunu aynı kaynaktan count kamerayla ölç (CPU alt süreçleri de kapsar)"""
+    input_format = None
+    if url is None:
+        url = 'testsrc=size=1920x1080:rate=25'
+        input_format = 'lavfi'
+    counts = [0] * count
+    stop = threading.Event()
+    start_children = _children_cpu()
+    start_cpu = time.process_time()
+    start_wall = time.perf_counter()
+    decoders = [create_backend(backend_name, url, width, height, input_format=input_format) for _ in range(count)]
+
+    def reader(index, decoder):
+        while not stop.is_set():
+            if decoder.read() is None:
+                break
+            counts[index] += 1
+
+    threads = [threading.Thread(target=reader, args=(i, d), daemon=True) for i, d in enumerate(decoders)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    frames = sum(counts)
+    thread_count = threading.active_count()
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=2)
+    for decoder in decoders:
+        decoder.close()
+    wall = time.perf_counter() - start_wall
+    cpu = time.process_time() - start_cpu + _children_cpu() - start_children
+    return {
+        "fps": frames / duration,
+        "cpu": 100.0 * cpu / wall,
+        "threads": thread_count
+    }
+
+
+MODES = {
+    "threaded": bench_threaded,
+    "async": bench_async
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTSP okuyucu modellerini sentetik kameralarla karşılaştır")
+    parser.add_argument('--cameras', type=int, nargs='+', default=[16, 32, 64])
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=["threaded", "async"])
+    parser.add_argument('--size', default='320x180', help="Kare boyutu, ör. 640x360")
+    parser.add_argument('--fps', type=float, default=10.0)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--lavfi', action='store_true', help="Sentetik kamera olarak ffmpeg testsrc kullan")
+    parser.add_argument('--backends', nargs='*', choices=sorted(available_backends()), default=[],
+                        help="Çözücü arka uçlarını da karşılaştır (ör. ffmpeg pyav)")
+    parser.add_argument('--url', default=None, help="Çözücü testi için kaynak (varsayılan: 1080p testsrc)")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    print(f"{'Mod':<12}{'Kamera':>8}{'Kare/s':>12}{'Beklenen':>12}{'CPU %':>10}{'Thread':>8}")
+    for count in args.cameras:
+        commands = [synthetic_command(width, height, args.fps, args.lavfi) for _ in range(count)]
+        for mode in args.modes:
+            result = MODES[mode](commands, width, height, args.duration)
+            print(f"{mode:<12}{count:>8}{result['fps']:>12.1f}{count * args.fps:>12.1f}"
+                  f"{result['cpu']:>10.1f}{result['threads']:>8}")
+        # Çözücüler kaynağı olabildiğince hızlı çözer; beklenen değer yoktur
+        for backend in args.backends:
+            result = bench_decoder(backend, count, width, height, args.duration, args.url)
+            print(f"{backend:<12}{count:>8}{result['fps']:>12.1f}{'-':>12}"
+                  f"{result['cpu']:>10.1f}{result['threads']:>8}")
+
+
+if __name__ == "__main__":
+    main()
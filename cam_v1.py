@@ -1,18 +1,42 @@
 import ffmpeg
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.widgets import Button
+from matplotlib.widgets import Button, RectangleSelector
 import threading
 import time
 import tkinter as tk
 from tkinter import simpledialog
+from ffmpeg_stats import PROGRESS_ARGS, StderrMonitor
+from overlay import FrameOverlay
+from stream_watchdog import DeadlineReader, FrozenStreamWatchdog, ReadTimeout
+from frame_trace import FrameTracer
 
 class RTSPViewer:
     def __init__(self):
         self.is_running = False
         self.is_testing = False
-        self.process = None
+        # (süreç, okuyucu, stderr izleyici, genişlik, yükseklik, uygulanan ROI): okuma thread'i
+        # tutarlı bir görüntü alsın diye yeniden yapılandırmada tek atamayla değiştirilir
+        self.pipeline = None
         self.rtsp_url = ""
+        # Dijital yakınlaştırma: ROI, görüntünün kesirleri olarak (x, y, genişlik, yükseklik)
+        self.roi = None
+        self.zoom_upscale = False  # True: ROI ffmpeg'de 1280x720'ye büyütülür
+        self.source_size = None
+        self.last_full_frame = None
+        self.hold_display = False
+        self.reconfiguring = False
+        # Ad, saat ve FPS her karede NumPy ile görüntüye yakılır (başlık güncellenmez)
+        self.overlay = FrameOverlay(label="Canlı Görüntü")
+        # Kare gelmezse ya da kareler aynı kalırsa bu kadar saniyede donmuş sayılır
+        self.freeze_timeout = 5.0
+        self.read_timeout = 1.0
+        self.watchdog = FrozenStreamWatchdog(self.freeze_timeout, on_frozen=self.on_frozen)
+        # Kapanışı (EOF) bildirilen son süreç; her süreç için bir kez yeniden bağlanılır
+        self.ended_process = None
+        # Kare aşamalarının zaman çizelgesi: 't' tuşu ya da RTSP_TRACE=1 ile açılır
+        self.tracer = FrameTracer()
+        self.frame_number = 0
         self.fig = None
         self.setup_ui()
         
@@ -52,11 +76,25 @@ class RTSPViewer:
         self.close_ax.axis('off')
         self.close_btn = Button(self.close_ax, ' KAPAT ', color='red')
         
+        # Tam görüntüye dönüş butonu (sol alt)
+        self.full_ax = self.fig.add_axes([0.04, 0.05, 0.19, 0.05])
+        self.full_btn = Button(self.full_ax, 'Tam Görüntü', color='lightgray')
+        
+        # Görüntü üzerinde sürükleyerek yakınlaştırma, sağ tık ile tam görüntü
+        self.roi_selector = RectangleSelector(
+            self.ax, self.on_roi_selected,
+            useblit=True, button=[1],
+            minspanx=10, minspany=10, spancoords='pixels'
+        )
+        
         # Etkileşimler
         self.url_btn.on_clicked(self.change_url)
         self.btn.on_clicked(self.toggle_stream)
         self.test_btn.on_clicked(self.start_connection_test)
         self.close_btn.on_clicked(self.close_app)
+        self.full_btn.on_clicked(self.reset_zoom)
+        self.fig.canvas.mpl_connect('button_press_event', self.on_mouse_press)
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key_press)
         
         # Pencere kapatma olayı
         self.fig.canvas.mpl_connect('close_event', self.on_close)
@@ -81,6 +119,11 @@ class RTSPViewer:
                 initialvalue=self.rtsp_url or "rtsp://"
             )
             if new_url:
+                if new_url.strip() != self.rtsp_url:
+                    # Yeni kameranın çözünürlüğü farklı olabilir; yakınlaştırma sıfırlanır
+                    self.roi = None
+                    self.source_size = None
+                    self.last_full_frame = None
                 self.rtsp_url = new_url.strip()
                 self.update_info(f"URL başarıyla güncellendi: {self.rtsp_url}")
         finally:
@@ -89,6 +132,168 @@ class RTSPViewer:
             except:
                 pass
         
+    def on_mouse_press(self, event):
+        if event.inaxes == self.ax and event.button == 3:
+            self.reset_zoom(event)
+
+    def on_key_press(self, event):
+        if event.key == 't':
+            self.toggle_trace()
+
+    def toggle_trace(self):
+        """İzlemeyi aç/kapat; kapatırken kayıt JSON olarak dışa aktarılır"""
+        if self.tracer.toggle():
+            self.update_info("Kare izleme açık - kapatmak ve kaydetmek için 't'")
+        else:
+            self.export_trace()
+
+    def export_trace(self):
+        try:
+            path = self.tracer.export_chrome_trace()
+            self.update_info(f"İzleme kaydedildi: {path} (ui.perfetto.dev ile açın)")
+        except Exception as e:
+            self.update_info(f"İzleme kaydedilemedi: {str(e)}")
+
+    def on_roi_selected(self, eclick, erelease):
+        """Seçilen dikdörtgeni mevcut görünüm içinde yeni ROI'ye çevir"""
+        if None in (eclick.xdata, eclick.ydata, erelease.xdata, erelease.ydata):
+            return
+        fx0, fx1 = sorted((eclick.xdata / 1280, erelease.xdata / 1280))
+        fy0, fy1 = sorted((eclick.ydata / 720, erelease.ydata / 720))
+        
+        # 16:9 oranını koru: seçimi merkezi etrafında kareye (kesir uzayında) genişlet
+        size = min(max(fx1 - fx0, fy1 - fy0), 1.0)
+        cx, cy = (fx0 + fx1) / 2, (fy0 + fy1) / 2
+        fx0 = min(max(cx - size / 2, 0.0), 1.0 - size)
+        fy0 = min(max(cy - size / 2, 0.0), 1.0 - size)
+        
+        # Yakınlaştırılmış görünümde yapılan seçim ekrandaki ROI'ye göre birleştirilir
+        ox, oy, ow, oh = self.shown_roi() or (0.0, 0.0, 1.0, 1.0)
+        roi = (ox + fx0 * ow, oy + fy0 * oh, size * ow, size * oh)
+        if roi[2] < 0.02:
+            self.update_info("Uyarı: Seçilen alan çok küçük")
+            return
+        self.set_roi(roi)
+        self.update_info(f"Dijital yakınlaştırma: %{100 * roi[2]:.0f} alan")
+
+    def reset_zoom(self, event):
+        """Tam görüntüye dön; son tam kare beklemeden gösterilir"""
+        if self.roi is None and self.shown_roi() is None:
+            return
+        if self.last_full_frame is not None:
+            self.im.set_data(self.last_full_frame)
+            self.hold_display = self.is_running
+            self.fig.canvas.draw_idle()
+        self.set_roi(None)
+        self.update_info("Tam görüntü")
+
+    def shown_roi(self):
+        """Ekrandaki görüntüye uygulanmış ROI (istenen self.roi henüz uygulanmamış olabilir)"""
+        pipeline = self.pipeline
+        return pipeline[5] if pipeline else self.roi
+
+    def set_roi(self, roi):
+        self.roi = roi
+        if not self.is_running or self.reconfiguring:
+            # Çalışan yeniden yapılandırma en son ROI'yi uygular
+            return
+        self.reconfiguring = True
+        threading.Thread(target=self._reconfigure, daemon=True).start()
+
+    def on_frozen(self, name, reason):
+        """Donmuş akışı, ROI değişimiyle aynı önce-bağlan-sonra-kes yoluyla yeniden başlat"""
+        self.update_info(f"Uyarı: Donmuş akış ({reason}), yeniden bağlanıyor...")
+        self.set_roi(self.roi)
+
+    def _reconfigure(self):
+        try:
+            while self.is_running:
+                roi = self.roi
+                shown = self.swap_process(roi)
+                # Başarısızlıkta self.roi ekrandakine döner; bu arada yeni istek gelmediyse dur
+                if self.roi == shown:
+                    break
+        finally:
+            self.reconfiguring = False
+
+    def build_process(self, roi):
+        """ROI kırpmasını ffmpeg filtre grafiğine ekleyerek süreci başlat"""
+        width, height = 1280, 720
+        stream = ffmpeg.input(self.rtsp_url, rtsp_transport='tcp', timeout=5000000)
+        if roi:
+            x, y, w, h = roi
+            stream = stream.filter('crop', f'iw*{w:.5f}', f'ih*{h:.5f}', f'iw*{x:.5f}', f'ih*{y:.5f}')
+            if not self.zoom_upscale:
+                if self.source_size is None:
+                    self.source_size = self.probe_source_size()
+                if self.source_size:
+                    # Yalnızca ROI pikselleri pipe'tan geçer (1280x720'yi aşmayacak şekilde)
+                    roi_w, roi_h = self.source_size[0] * w, self.source_size[1] * h
+                    scale = min(1.0, 1280 / roi_w, 720 / roi_h)
+                    width = max(2, int(roi_w * scale) // 2 * 2)
+                    height = max(2, int(roi_h * scale) // 2 * 2)
+        process = (
+            stream
+            .output('pipe:', format='rawvideo', pix_fmt='rgb24', s=f'{width}x{height}')
+            .global_args(*PROGRESS_ARGS)
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        return process, width, height
+
+    def probe_source_size(self):
+        """Kaynağın gerçek çözünürlüğünü öğren; başarısızsa ROI 1280x720'ye ölçeklenir"""
+        try:
+            info = ffmpeg.probe(self.rtsp_url, rtsp_transport='tcp', timeout=5000000)
+            video = next(st for st in info['streams'] if st['codec_type'] == 'video')
+            return int(video['width']), int(video['height'])
+        except Exception:
+            return None
+
+    def swap_process(self, roi):
+        """Önce-bağlan-sonra-kes: yeni süreç ilk kareyi verince eskisi kapatılır.
+        Ekranda kalan ROI'yi döndürür."""
+        try:
+            process, width, height = self.build_process(roi)
+        except Exception as e:
+            self.update_info(f"Yeniden yapılandırma hatası: {str(e)}")
+            return self._swap_failed(roi)
+        monitor = StderrMonitor(process, "Kamera")
+        reader = DeadlineReader(process.stdout)
+        try:
+            first = reader.read_frame(width * height * 3, timeout=2 * self.freeze_timeout)
+        except ReadTimeout:
+            first = None
+        if first is None or not self.is_running:
+            process.terminate()
+            reader.close()
+            if self.is_running:
+                self.update_info(f"Yeniden yapılandırma hatası: {monitor.snapshot()['last_error'][:150]}")
+            return self._swap_failed(roi)
+        
+        old_process, old_reader, old_monitor = self.pipeline[:3]
+        self.pipeline = (process, reader, monitor, width, height, roi)
+        self.watchdog.register("kamera")
+        self.im.set_data(np.frombuffer(first, np.uint8).reshape((height, width, 3)))
+        self.hold_display = False
+        try:
+            old_process.terminate()
+            old_process.wait(timeout=2)
+        except:
+            pass
+        old_reader.close()
+        old_monitor.join()
+        return roi
+
+    def _swap_failed(self, roi):
+        """Eski süreç çalışmaya devam eder; istenen ROI ekrandakine geri alınır ki
+        sonraki seçim ve tam kare saklama görünmeyen bir ROI'ye göre yapılmasın"""
+        shown = self.shown_roi()
+        if self.roi == roi:
+            self.roi = shown
+        self.hold_display = False
+        self.watchdog.register("kamera")
+        return shown
+
     def update_info(self, message):
         """Hata mesajlarını güncelle (artık üst panelde)"""
         self.info_text.set_text(message)
@@ -167,15 +372,21 @@ class RTSPViewer:
         self.update_info("Kameraya bağlanıyor...")
         
         try:
-            self.process = (
-                ffmpeg
-                .input(self.rtsp_url, rtsp_transport='tcp', timeout=5000000)
-                .output('pipe:', format='rawvideo', pix_fmt='rgb24', s='1280x720')
-                .run_async(pipe_stdout=True, pipe_stderr=True)
-            )
+            # Kaynak boyutu henüz bilinmiyorsa ffprobe arayüz thread'inde çalışmasın:
+            # tam görüntüyle başlanır, ROI arka plandaki yeniden yapılandırmayla uygulanır
+            needs_probe = self.roi is not None and not self.zoom_upscale and self.source_size is None
+            applied = None if needs_probe else self.roi
+            process, width, height = self.build_process(applied)
+            # stderr sürekli boşaltılmazsa pipe tamponu dolar ve ffmpeg donar
+            monitor = StderrMonitor(process, "Kamera")
+            self.pipeline = (process, DeadlineReader(process.stdout), monitor, width, height, applied)
+            self.watchdog.register("kamera")
+            self.watchdog.start()
             
             self.stream_thread = threading.Thread(target=self.update_frame, daemon=True)
             self.stream_thread.start()
+            if needs_probe:
+                self.set_roi(self.roi)
             
         except Exception as e:
             self.update_info(f"Bağlantı hatası: {str(e)}")
@@ -183,34 +394,57 @@ class RTSPViewer:
             self.btn.label.set_text("Başlat")
     
     def update_frame(self):
-        width, height = 1280, 720
-        frame_count = 0
-        start_time = time.time()
-        
         while self.is_running:
             try:
-                in_bytes = self.process.stdout.read(width * height * 3)
-                if not in_bytes:
-                    self.update_info("Uyarı: Akıştan veri alınamıyor. Bağlantı kesildi.")
-                    break
+                pipeline = self.pipeline
+                process, reader, monitor, width, height, roi = pipeline
+                tracer, n = self.tracer, self.frame_number
+                # Son tarihli okuma: kamera sessizce dursa da döngü takılmaz
+                try:
+                    with tracer.span("read", frame=n):
+                        buffer = reader.read_frame(width * height * 3, timeout=self.read_timeout)
+                except ReadTimeout:
+                    tracer.instant("read_timeout", frame=n)
+                    continue
+                if buffer is None:
+                    if pipeline is not self.pipeline:
+                        # ROI değişiminde eski süreç kapatıldı, yenisinden devam et
+                        continue
+                    # ffmpeg kapandı (ör. 5 sn zaman aşımı): donma gibi yeniden bağlanılır.
+                    # Yeniden bağlanma başarısızsa sonraki deneme gözetleyiciden gelir.
+                    if self.ended_process is not process:
+                        self.ended_process = process
+                        last_error = monitor.snapshot()["last_error"]
+                        self.update_info(f"Uyarı: Bağlantı kesildi, yeniden bağlanıyor... {last_error[:150]}")
+                        self.set_roi(self.roi)
+                    time.sleep(0.1)
+                    continue
                     
-                frame = np.frombuffer(in_bytes, np.uint8).reshape((height, width, 3))
-                self.im.set_data(frame)
-                
-                # FPS hesaplama ve gösterme
-                frame_count += 1
-                if frame_count % 10 == 0:
-                    fps = 10 / (time.time() - start_time)
-                    start_time = time.time()
-                    self.ax.set_title(f'Canlı Görüntü - {fps:.1f} FPS')
+                if pipeline is not self.pipeline:
+                    continue
+                self.frame_number += 1
+                with tracer.span("convert", frame=n):
+                    frame = np.frombuffer(buffer, np.uint8).reshape((height, width, 3))
+                with tracer.span("watchdog", frame=n):
+                    self.watchdog.feed("kamera", frame)
+                with tracer.span("overlay", frame=n):
+                    self.overlay.apply(frame, extra=monitor.summary())
+                if roi is None and not self.hold_display:
+                    # Tam görüntüye anında dönüş için son tam kare saklanır
+                    self.last_full_frame = frame
+                if not self.hold_display:
+                    with tracer.span("set_data", frame=n):
+                        self.im.set_data(frame)
                 
-                self.fig.canvas.draw()
-                self.fig.canvas.flush_events()
+                with tracer.span("draw", frame=n):
+                    self.fig.canvas.draw()
+                    self.fig.canvas.flush_events()
                 
             except Exception as e:
+                # Döngüden yalnızca stop_stream ile çıkılır
                 if self.is_running:
                     self.update_info(f"Görüntü aktarım hatası: {str(e)}")
-                break
+                    time.sleep(0.1)
     
     def stop_stream(self):
         if not self.is_running:
@@ -219,13 +453,21 @@ class RTSPViewer:
         self.is_running = False
         self.btn.label.set_text("Başlat")
         self.update_info("Akış durduruldu. Yeni bağlantı için Başlat'a basın.")
+        self.watchdog.stop()
+        if self.tracer.enabled:
+            self.tracer.disable()
+            self.export_trace()
         
-        if self.process:
+        if self.pipeline:
+            process, reader, monitor = self.pipeline[:3]
             try:
-                self.process.terminate()
-                self.process.wait(timeout=2)
+                process.terminate()
+                process.wait(timeout=2)
             except:
                 pass
+            reader.close()
+            monitor.join()
+            self.pipeline = None
     
     def run(self):
         try:
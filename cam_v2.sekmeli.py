@@ -1,18 +1,45 @@
 import ffmpeg
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.widgets import Button, RadioButtons
+from matplotlib.widgets import Button, RadioButtons, Slider
+import os
 import threading
 import time
 import tkinter as tk
 from tkinter import simpledialog
+from multi_output import MultiOutputStream
+from frame_timeline import FrameTimeline
+from overlay import FrameOverlay
+from stream_watchdog import FrozenStreamWatchdog
+from frame_trace import FrameTracer
+
+# Her kamera bir kez çözülür; ana görünüm ve küçük pencere aynı süreçten beslenir
+STREAM_VARIANTS = {"main": (1280, 720), "inset": (640, 360)}
+
+# Geri sarma zaman çizelgesi: küçük çıktıdan 320x180, saniyede 2 kare, son 5 dakika
+TIMELINE_DIR = "timeline"
+TIMELINE_MINUTES = 5
+
+# Donmuş akış algılama süresi ve kapanan akışlar için yeniden bağlanmalar arası en az süre (saniye)
+FREEZE_TIMEOUT = 5.0
+RESTART_DELAY = 2.0
+
+# Ne ana görünümde ne küçük pencerede gösterilen kameranın akışı bu kadar saniye sonra kapatılır;
+# süre içinde geri dönülürse yeniden bağlanmadan anında gösterilir
+STREAM_IDLE_GRACE = 10.0
 
 class RTSPViewer:
     def __init__(self):
         self.cameras = [
-            {"name": "Kamera 1", "url": "", "active": True, "process": None},
-            {"name": "Kamera 2", "url": "", "active": False, "process": None}
+            {"name": "Kamera 1", "url": "", "active": True, "stream": None, "timeline": None,
+             "overlay": FrameOverlay(label="Kamera 1"), "restart": False, "last_restart": 0.0, "idle_since": None},
+            {"name": "Kamera 2", "url": "", "active": False, "stream": None, "timeline": None,
+             "overlay": FrameOverlay(label="Kamera 2", show_time=False), "restart": False, "last_restart": 0.0, "idle_since": None}
         ]
+        self.scrub_offset = 0
+        self.watchdog = FrozenStreamWatchdog(FREEZE_TIMEOUT, on_frozen=self.on_frozen)
+        # Kare aşamalarının zaman çizelgesi: 't' tuşu ya da RTSP_TRACE=1 ile açılır
+        self.tracer = FrameTracer()
         self.is_running = False
         self.current_cam = 0
         self.fig = None
@@ -70,12 +97,65 @@ class RTSPViewer:
         self.ax2 = self.fig.add_axes([0.55, 0.25, 0.4, 0.4])
         self.im2 = self.ax2.imshow(np.zeros((360, 640, 3), dtype=np.uint8))
         self.ax2.axis('off')
-        self.ax2.set_title('İkinci Kamera', fontsize=10)
         self.ax2.set_visible(False)
         
+        # Geri sarma kaydırıcısı (sağ üst): 0 canlı görüntü, negatif değerler saniye önce
+        self.scrub_ax = self.fig.add_axes([0.5, 0.93, 0.35, 0.03])
+        self.scrub_slider = Slider(
+            self.scrub_ax, 'Geri Sar (sn)',
+            -TIMELINE_MINUTES * 60, 0, valinit=0, valstep=1
+        )
+        self.scrub_slider.on_changed(self.on_scrub)
+        
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key_press)
+        
         # Pencere kapatma olayı
         self.fig.canvas.mpl_connect('close_event', self.on_close)
 
+    def on_key_press(self, event):
+        if event.key == 't':
+            self.toggle_trace()
+
+    def toggle_trace(self):
+        """İzlemeyi aç/kapat; kapatırken kayıt JSON olarak dışa aktarılır"""
+        if self.tracer.toggle():
+            self.update_info("Kare izleme açık - kapatmak ve kaydetmek için 't'")
+        else:
+            self.export_trace()
+
+    def export_trace(self):
+        try:
+            path = self.tracer.export_chrome_trace()
+            self.update_info(f"İzleme kaydedildi: {path} (ui.perfetto.dev ile açın)")
+        except Exception as e:
+            self.update_info(f"İzleme kaydedilemedi: {str(e)}")
+
+    def get_timeline(self, cam_index):
+        """Kameranın zaman çizelgesini aç (önceki oturumun kayıtları korunur)"""
+        cam = self.cameras[cam_index]
+        if cam["timeline"] is None:
+            path = os.path.join(TIMELINE_DIR, cam["name"].replace(" ", "_").lower())
+            cam["timeline"] = FrameTimeline(path, minutes=TIMELINE_MINUTES)
+        return cam["timeline"]
+
+    def on_scrub(self, value):
+        """Seçilen ana ait kareyi zaman çizelgesinden göster; çözme yapılmaz"""
+        self.scrub_offset = value
+        cam = self.cameras[self.current_cam]
+        if value >= 0:
+            # Canlı görüntüde ad ve saat kareye katman olarak yazılır
+            self.ax.set_title("")
+            self.fig.canvas.draw_idle()
+            return
+        result = self.get_timeline(self.current_cam).lookup(time.time() + value)
+        if result is None:
+            self.update_info("Zaman çizelgesinde kayıt yok")
+            return
+        timestamp, frame = result
+        self.im.set_data(frame)
+        self.ax.set_title(f"{cam['name']} - Geri sarma {time.strftime('%H:%M:%S', time.localtime(timestamp))}", fontsize=12)
+        self.fig.canvas.draw_idle()
+
     def switch_camera(self, label):
         """Aktif kamerayı değiştir"""
         for i, cam in enumerate(self.cameras):
@@ -88,14 +168,16 @@ class RTSPViewer:
         """Çift görünümü aç/kapat"""
         self.dual_view = not self.dual_view
         self.ax2.set_visible(self.dual_view)
+        if self.is_running and self.dual_view:
+            self.ensure_stream(self.other_cam())
         self.update_info(f"Çift görünüm {'açıldı' if self.dual_view else 'kapandı'}")
         self.fig.canvas.draw_idle()
 
     def update_display(self):
         """Görüntüyü güncelle"""
         if self.is_running:
-            self.stop_stream()
-            self.start_stream()
+            # Kamera zaten açıksa yeni bağlantı kurulmaz, yalnızca rolü değişir
+            self.ensure_stream(self.current_cam)
         self.update_info(f"Aktif kamera: {self.cameras[self.current_cam]['name']}")
 
     def change_url(self, event):
@@ -170,6 +252,73 @@ class RTSPViewer:
         else:
             self.stop_stream()
 
+    def other_cam(self):
+        return 1 if self.current_cam == 0 else 0
+
+    def ensure_stream(self, cam_index):
+        """Kameranın çok çıktılı akışı yoksa başlat"""
+        cam = self.cameras[cam_index]
+        if cam["stream"] or not cam["url"]:
+            return
+        cam["stream"] = MultiOutputStream(cam["url"], STREAM_VARIANTS, cam["name"], tracer=self.tracer)
+        timeline = self.get_timeline(cam_index)
+        cam["stream"].subscribe("inset", lambda name, frame: timeline.append(frame))
+        cam["stream"].subscribe("inset", self.watchdog.feed)
+        self.watchdog.register(cam["name"])
+        cam["stream"].start()
+
+    def on_frozen(self, name, reason):
+        """Gözetleyici donmuş akış bildirdi; görüntü döngüsü kamerayı yeniden başlatır"""
+        for cam in self.cameras:
+            if cam["name"] == name:
+                cam["restart"] = True
+                self.update_info(f"{name} donmuş ({reason}), yeniden bağlanıyor...")
+
+    def used_cams(self):
+        """Ana görünümde ya da küçük pencerede gösterilen kameralar"""
+        used = {self.current_cam}
+        if self.dual_view:
+            used.add(self.other_cam())
+        return used
+
+    def release_unused_streams(self):
+        """Kullanılmayan akışları bekleme süresi dolunca kapat (zaman çizelgesi kaydı da durur)"""
+        used = self.used_cams()
+        now = time.monotonic()
+        for i, cam in enumerate(self.cameras):
+            if i in used or cam["stream"] is None:
+                cam["idle_since"] = None
+                continue
+            if cam["idle_since"] is None:
+                cam["idle_since"] = now
+            elif now - cam["idle_since"] >= STREAM_IDLE_GRACE:
+                stream, cam["stream"], cam["idle_since"] = cam["stream"], None, None
+                cam["restart"] = False
+                self.watchdog.unregister(cam["name"])
+                # Süreç kapatma görüntü döngüsünü bekletmesin
+                threading.Thread(target=stream.stop, daemon=True).start()
+
+    def restart_frozen_streams(self):
+        used = self.used_cams()
+        for i, cam in enumerate(self.cameras):
+            if cam["restart"] and i not in used:
+                # Gösterilmeyen kamera yeniden bağlanmaz; bekleme süresi dolunca kapatılır
+                cam["restart"] = False
+                continue
+            if cam["restart"] and time.monotonic() - cam["last_restart"] >= RESTART_DELAY:
+                cam["restart"] = False
+                cam["last_restart"] = time.monotonic()
+                if cam["stream"]:
+                    cam["stream"].stop()
+                    cam["stream"] = None
+                try:
+                    with self.tracer.span("restart", cam=cam["name"]):
+                        self.ensure_stream(i)
+                except Exception as e:
+                    # Gözetleyici süre dolunca yeniden dener
+                    self.watchdog.register(cam["name"])
+                    self.update_info(f"{cam['name']} yeniden bağlanamadı: {str(e)}")
+
     def start_stream(self):
         """Akışı başlat"""
         if not self.cameras[self.current_cam]["url"]:
@@ -182,23 +331,12 @@ class RTSPViewer:
         
         try:
             # Ana kamera için akış
-            self.cameras[self.current_cam]["process"] = (
-                ffmpeg
-                .input(self.cameras[self.current_cam]["url"], rtsp_transport='tcp', timeout=5000000)
-                .output('pipe:', format='rawvideo', pix_fmt='rgb24', s='1280x720')
-                .run_async(pipe_stdout=True, pipe_stderr=True)
-            )
+            self.ensure_stream(self.current_cam)
             
             # Çift görünüm aktifse ikinci kamera için akış
             if self.dual_view:
-                other_cam = 1 if self.current_cam == 0 else 0
-                if self.cameras[other_cam]["url"]:
-                    self.cameras[other_cam]["process"] = (
-                        ffmpeg
-                        .input(self.cameras[other_cam]["url"], rtsp_transport='tcp', timeout=5000000)
-                        .output('pipe:', format='rawvideo', pix_fmt='rgb24', s='640x360')
-                        .run_async(pipe_stdout=True, pipe_stderr=True)
-                    )
+                self.ensure_stream(self.other_cam())
+            self.watchdog.start()
             
             self.stream_thread = threading.Thread(target=self.update_frame, daemon=True)
             self.stream_thread.start()
@@ -207,44 +345,74 @@ class RTSPViewer:
             self.update_info(f"Başlatma hatası: {str(e)}")
             self.is_running = False
             self.btn.label.set_text("Başlat")
+            self.stop_camera_streams()
 
     def update_frame(self):
         """Görüntüyü sürekli güncelle"""
-        width, height = 1280, 720
-        small_width, small_height = 640, 360
+        # (kamera, çıktı) başına (akış, gösterilen son sıra no); yeniden başlatılan
+        # akışın sıra numaraları 0'dan başladığından numara yalnızca aynı akış için geçerlidir
+        shown = {}
+        tracer = self.tracer
         
         while self.is_running:
             try:
                 # Ana kameradan görüntü al
-                in_bytes = self.cameras[self.current_cam]["process"].stdout.read(width * height * 3)
-                if not in_bytes:
-                    self.update_info("Ana kameradan veri alınamıyor")
-                    break
+                cam_index = self.current_cam
+                name = self.cameras[cam_index]["name"]
+                with tracer.span("restart_check", cam=name):
+                    self.restart_frozen_streams()
+                    self.release_unused_streams()
+                
+                stream = self.cameras[cam_index]["stream"]
+                if stream is None:
+                    time.sleep(0.05)
+                    continue
+                shown_stream, shown_seq = shown.get((cam_index, "main"), (None, 0))
+                after_seq = shown_seq if shown_stream is stream else 0
+                with tracer.span("wait", cam=name, frame=after_seq + 1):
+                    result = stream.wait_for_frame("main", after_seq, timeout=1.0)
+                if result is None:
+                    if stream.ended:
+                        # ffmpeg kapandı (ör. 5 sn zaman aşımı): donma gibi yeniden bağlanılır
+                        if not self.cameras[cam_index]["restart"]:
+                            self.cameras[cam_index]["restart"] = True
+                            last_error = stream.monitor.snapshot()["last_error"]
+                            self.update_info(f"Ana kamera bağlantısı kesildi, yeniden bağlanıyor...\n{last_error[:150]}")
+                        time.sleep(0.05)
+                    continue
                     
-                frame = np.frombuffer(in_bytes, np.uint8).reshape((height, width, 3))
-                self.im.set_data(frame)
-                self.ax.set_title(self.cameras[self.current_cam]["name"], fontsize=12)
+                seq, frame = result
+                shown[(cam_index, "main")] = (stream, seq)
+                if self.scrub_offset >= 0:
+                    overlay = self.cameras[cam_index]["overlay"]
+                    with tracer.span("overlay", cam=name, frame=seq):
+                        frame = overlay.apply(frame, extra=stream.monitor.summary())
+                    with tracer.span("set_data", cam=name, frame=seq):
+                        self.im.set_data(frame)
                 
-                # Çift görünüm aktifse ikinci kameradan görüntü al
+                # Çift görünüm aktifse ikinci kameranın küçük çıktısını göster
                 if self.dual_view:
-                    other_cam = 1 if self.current_cam == 0 else 0
-                    if self.cameras[other_cam]["process"]:
-                        try:
-                            small_bytes = self.cameras[other_cam]["process"].stdout.read(small_width * small_height * 3)
-                            if small_bytes:
-                                small_frame = np.frombuffer(small_bytes, np.uint8).reshape((small_height, small_width, 3))
+                    other_cam = self.other_cam()
+                    other_stream = self.cameras[other_cam]["stream"]
+                    if other_stream:
+                        inset_seq, small_frame = other_stream.latest("inset")
+                        if small_frame is not None and shown.get((other_cam, "inset")) != (other_stream, inset_seq):
+                            shown[(other_cam, "inset")] = (other_stream, inset_seq)
+                            other_name = self.cameras[other_cam]["name"]
+                            with tracer.span("overlay", cam=other_name, frame=inset_seq):
+                                small_frame = self.cameras[other_cam]["overlay"].apply(small_frame)
+                            with tracer.span("set_data", cam=other_name, frame=inset_seq):
                                 self.im2.set_data(small_frame)
-                                self.ax2.set_title(self.cameras[other_cam]["name"], fontsize=10)
-                        except:
-                            pass
                 
-                self.fig.canvas.draw()
-                self.fig.canvas.flush_events()
+                with tracer.span("draw", cam=name, frame=seq):
+                    self.fig.canvas.draw()
+                    self.fig.canvas.flush_events()
                 
             except Exception as e:
+                # Döngüden yalnızca stop_stream ile çıkılır
                 if self.is_running:
                     self.update_info(f"Görüntü alma hatası: {str(e)}")
-                break
+                    time.sleep(0.1)
 
     def stop_stream(self):
         """Akışı durdur"""
@@ -254,19 +422,29 @@ class RTSPViewer:
         self.is_running = False
         self.btn.label.set_text("Başlat")
         self.update_info("Akış durduruldu")
-        
+        self.stop_camera_streams()
+        if self.tracer.enabled:
+            self.tracer.disable()
+            self.export_trace()
+
+    def stop_camera_streams(self):
+        """Tüm kamera süreçlerini kapat"""
+        self.watchdog.stop()
         for cam in self.cameras:
-            if cam["process"]:
-                try:
-                    cam["process"].terminate()
-                    cam["process"].wait(timeout=2)
-                    cam["process"] = None
-                except:
-                    pass
+            self.watchdog.unregister(cam["name"])
+            cam["restart"] = False
+            cam["idle_since"] = None
+            if cam["stream"]:
+                cam["stream"].stop()
+                cam["stream"] = None
 
     def on_close(self, event):
         """Pencere kapatıldığında kaynakları serbest bırak"""
         self.stop_stream()
+        for cam in self.cameras:
+            if cam["timeline"]:
+                cam["timeline"].close()
+                cam["timeline"] = None
 
     def run(self):
         """Uygulamayı çalıştır"""
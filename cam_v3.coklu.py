@@ -6,14 +6,44 @@ import threading
 import time
 import tkinter as tk
 from tkinter import simpledialog
+from decoders import available_backends, create_backend
+from overlay import FrameOverlay
+from stream_watchdog import FrozenStreamWatchdog, ReadTimeout
+from frame_trace import FrameTracer
+from timelapse_archive import TimelapseWriter
+from cpu_scheduler import CpuBudgetScheduler, PRIORITY_HIGH, PRIORITY_NAMES, PRIORITY_NORMAL, QUALITY_LEVELS
+
+# Donmuş akış algılama süresi (saniye) ve kamera başına okuma son tarihi
+FREEZE_TIMEOUT = 5.0
+READ_TIMEOUT = 0.02
+
+# Toplam CPU bütçesi (%); aşılınca düşük öncelikli kameraların kalitesi düşürülür
+CPU_BUDGET = 80.0
+
+# Denetim arşivi: her kameradan bu aralıkla bir kare, gün başına tek kapsayıcı dosyaya
+TIMELAPSE_DIR = "timelapse"
+TIMELAPSE_INTERVAL = 5.0
 
 class DualRTSPViewer:
     def __init__(self):
         self.cameras = [
-            {"name": "Kamera 1", "url": "", "process": None, "frame": None, "fps": 0, "frame_count": 0, "last_time": time.time()},
-            {"name": "Kamera 2", "url": "", "process": None, "frame": None, "fps": 0, "frame_count": 0, "last_time": time.time()}
+            {"name": "Kamera 1", "url": "", "backend": "ffmpeg", "decoder": None, "frame": None, "pts": None, "fps": 0, "frame_count": 0, "last_time": time.time(),
+             "overlay": FrameOverlay(label="Kamera 1"), "restart": False, "priority": PRIORITY_NORMAL, "level": 0},
+            {"name": "Kamera 2", "url": "", "backend": "ffmpeg", "decoder": None, "frame": None, "pts": None, "fps": 0, "frame_count": 0, "last_time": time.time(),
+             "overlay": FrameOverlay(label="Kamera 2"), "restart": False, "priority": PRIORITY_NORMAL, "level": 0}
         ]
         self.is_running = False
+        self.watchdog = FrozenStreamWatchdog(FREEZE_TIMEOUT, on_frozen=self.on_frozen)
+        self.scheduler = CpuBudgetScheduler(self.apply_quality, budget=CPU_BUDGET)
+        # Kare aşamalarının zaman çizelgesi: 't' tuşu ya da RTSP_TRACE=1 ile açılır
+        self.tracer = FrameTracer()
+        self.timelapse = None
+        for cam in self.cameras:
+            # Süreç içi çözücülerde (PyAV) pid yoktur, maliyet toplam CPU'ya yansır
+            self.scheduler.add_camera(
+                cam["name"], cam["priority"],
+                get_pid=lambda cam=cam: getattr(getattr(cam["decoder"], "process", None), "pid", None)
+            )
         self.fig = None
         self.setup_ui()
 
@@ -25,13 +55,13 @@ class DualRTSPViewer:
         self.ax1 = self.fig.add_axes([0.02, 0.15, 0.47, 0.75])
         self.im1 = self.ax1.imshow(np.zeros((720, 1280, 3), dtype=np.uint8))
         self.ax1.axis('off')
-        self.ax1.set_title('Kamera 1 - FPS: 0.0', pad=10)
+        self.ax1.set_title('Kamera 1', pad=10)
         
         # Kamera 2 Görüntü Alanı (Sağ)
         self.ax2 = self.fig.add_axes([0.51, 0.15, 0.47, 0.75])
         self.im2 = self.ax2.imshow(np.zeros((720, 1280, 3), dtype=np.uint8))
         self.ax2.axis('off')
-        self.ax2.set_title('Kamera 2 - FPS: 0.0', pad=10)
+        self.ax2.set_title('Kamera 2', pad=10)
         
         # Bilgi Paneli (Üst Orta)
         self.info_ax = self.fig.add_axes([0.3, 0.9, 0.4, 0.05])
@@ -61,9 +91,47 @@ class DualRTSPViewer:
         self.test_btn = Button(self.test_ax, 'Bağlantıları Sına', color='lightblue')
         self.test_btn.on_clicked(self.test_connections)
         
+        # Çözücü arka ucu seçimi (kamera başına)
+        self.backend1_btn_ax = self.fig.add_axes([0.1, 0.105, 0.15, 0.035])
+        self.backend1_btn = Button(self.backend1_btn_ax, 'Çözücü: ffmpeg', color='lightgray')
+        self.backend1_btn.on_clicked(lambda x: self.cycle_backend(0))
+        
+        self.backend2_btn_ax = self.fig.add_axes([0.3, 0.105, 0.15, 0.035])
+        self.backend2_btn = Button(self.backend2_btn_ax, 'Çözücü: ffmpeg', color='lightgray')
+        self.backend2_btn.on_clicked(lambda x: self.cycle_backend(1))
+        
+        # Kamera önceliği (CPU bütçesi aşılınca önce düşük öncelikliler düşürülür)
+        self.priority1_btn_ax = self.fig.add_axes([0.5, 0.105, 0.15, 0.035])
+        self.priority1_btn = Button(self.priority1_btn_ax, 'Öncelik: normal', color='lightgray')
+        self.priority1_btn.on_clicked(lambda x: self.cycle_priority(0))
+        
+        self.priority2_btn_ax = self.fig.add_axes([0.7, 0.105, 0.15, 0.035])
+        self.priority2_btn = Button(self.priority2_btn_ax, 'Öncelik: normal', color='lightgray')
+        self.priority2_btn.on_clicked(lambda x: self.cycle_priority(1))
+        
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key_press)
+        
         # Pencere kapatma olayı
         self.fig.canvas.mpl_connect('close_event', self.on_close)
 
+    def on_key_press(self, event):
+        if event.key == 't':
+            self.toggle_trace()
+
+    def toggle_trace(self):
+        """İzlemeyi aç/kapat; kapatırken kayıt JSON olarak dışa aktarılır"""
+        if self.tracer.toggle():
+            self.update_info("Kare izleme açık - kapatmak ve kaydetmek için 't'")
+        else:
+            self.export_trace()
+
+    def export_trace(self):
+        try:
+            path = self.tracer.export_chrome_trace()
+            self.update_info(f"İzleme kaydedildi: {path} (ui.perfetto.dev ile açın)")
+        except Exception as e:
+            self.update_info(f"İzleme kaydedilemedi: {str(e)}")
+
     def change_url(self, cam_index):
         """Kamera URL'sini değiştir"""
         root = tk.Tk()
@@ -83,13 +151,54 @@ class DualRTSPViewer:
             except:
                 pass
 
+    def cycle_backend(self, cam_index):
+        """Kameranın çözücü arka ucunu sıradakiyle değiştir"""
+        if self.is_running:
+            self.update_info("Çözücüyü değiştirmek için önce akışı durdurun")
+            return
+        backends = available_backends()
+        cam = self.cameras[cam_index]
+        current = backends.index(cam["backend"]) if cam["backend"] in backends else -1
+        cam["backend"] = backends[(current + 1) % len(backends)]
+        btn = self.backend1_btn if cam_index == 0 else self.backend2_btn
+        btn.label.set_text(f'Çözücü: {cam["backend"]}')
+        self.update_info(f"{cam['name']} çözücü: {cam['backend']}")
+
+    def cycle_priority(self, cam_index):
+        """Kamera önceliğini düşük -> normal -> öncelikli sırasıyla değiştir"""
+        cam = self.cameras[cam_index]
+        cam["priority"] = (cam["priority"] + 1) % (PRIORITY_HIGH + 1)
+        self.scheduler.set_priority(cam["name"], cam["priority"])
+        btn = self.priority1_btn if cam_index == 0 else self.priority2_btn
+        btn.label.set_text(f'Öncelik: {PRIORITY_NAMES[cam["priority"]]}')
+        self.fig.canvas.draw_idle()
+
+    def apply_quality(self, name, level_index, level):
+        """Zamanlayıcının kalite kararını uygula; okuma thread'i kamerayı yeni ayarlarla açar"""
+        for cam in self.cameras:
+            if cam["name"] == name:
+                cam["level"] = level_index
+                self.tracer.instant("quality", cam=name, level=level_index)
+                cam["restart"] = self.is_running
+                fps = f"{level['fps']} FPS" if level["fps"] else "tam FPS"
+                self.update_info(f"{name} kalite seviyesi {level_index}: {level['size'][0]}x{level['size'][1]}, {fps}")
+
+    def open_decoder(self, cam):
+        """Kameranın çözücüsünü mevcut kalite seviyesiyle aç"""
+        level = QUALITY_LEVELS[cam["level"]]
+        width, height = level["size"]
+        return create_backend(
+            cam["backend"], cam["url"], width, height,
+            fps=level["fps"], threads=level["threads"], skip_frame=level["skip_frame"]
+        )
+
     def update_info(self, message):
         """Bilgi panelini güncelle"""
         self.info_text.set_text(message)
         self.fig.canvas.draw_idle()
 
     def update_fps(self, cam_index):
-        """FPS bilgisini güncelle ve başlıkta göster"""
+        """FPS bilgisini güncelle (görüntüye katman olarak yazılır)"""
         cam = self.cameras[cam_index]
         current_time = time.time()
         time_diff = current_time - cam['last_time']
@@ -98,11 +207,6 @@ class DualRTSPViewer:
             cam['fps'] = cam['frame_count'] / time_diff
             cam['frame_count'] = 0
             cam['last_time'] = current_time
-            
-            if cam_index == 0:
-                self.ax1.set_title(f'Kamera 1 - FPS: {cam["fps"]:.1f}')
-            else:
-                self.ax2.set_title(f'Kamera 2 - FPS: {cam["fps"]:.1f}')
 
     def test_connections(self, event):
         """Her iki kameranın bağlantısını test et"""
@@ -156,21 +260,18 @@ class DualRTSPViewer:
         self.update_info("Akış başlatılıyor...")
         
         try:
-            # Kamera 1 için akış
-            self.cameras[0]["process"] = (
-                ffmpeg
-                .input(self.cameras[0]["url"], rtsp_transport='tcp', timeout=5000000)
-                .output('pipe:', format='rawvideo', pix_fmt='rgb24', s='1280x720')
-                .run_async(pipe_stdout=True)
-            )
-            
-            # Kamera 2 için akış
-            self.cameras[1]["process"] = (
-                ffmpeg
-                .input(self.cameras[1]["url"], rtsp_transport='tcp', timeout=5000000)
-                .output('pipe:', format='rawvideo', pix_fmt='rgb24', s='1280x720')
-                .run_async(pipe_stdout=True)
-            )
+            # Her kamera kendi seçili çözücü arka ucuyla açılır
+            for cam in self.cameras:
+                cam["decoder"] = self.open_decoder(cam)
+                self.watchdog.register(cam["name"])
+            self.watchdog.start()
+            self.scheduler.start()
+            # Arşiv ayrı bağlantı açmaz, okuma döngüsündeki karelerden beslenir
+            try:
+                self.timelapse = TimelapseWriter(TIMELAPSE_DIR, interval=TIMELAPSE_INTERVAL)
+            except RuntimeError as e:
+                self.timelapse = None
+                self.update_info(f"Zaman atlamalı arşiv kapalı: {str(e)}")
             
             # Frame güncelleme thread'i
             self.stream_thread = threading.Thread(target=self.update_frames, daemon=True)
@@ -180,37 +281,59 @@ class DualRTSPViewer:
             self.update_info(f"Başlatma hatası: {str(e)}")
             self.is_running = False
             self.btn.label.set_text("Başlat")
+            self.close_decoders()
 
     def update_frames(self):
         """Her iki kameradan gelen görüntüleri güncelle"""
-        width, height = 1280, 720
+        images = [self.im1, self.im2]
+        tracer = self.tracer
         
         while self.is_running:
             try:
-                # Kamera 1'den görüntü al
-                bytes1 = self.cameras[0]["process"].stdout.read(width * height * 3)
-                if bytes1:
-                    frame1 = np.frombuffer(bytes1, np.uint8).reshape((height, width, 3))
-                    self.im1.set_data(frame1)
-                    self.cameras[0]['frame_count'] += 1
-                    self.update_fps(0)
-                
-                # Kamera 2'den görüntü al
-                bytes2 = self.cameras[1]["process"].stdout.read(width * height * 3)
-                if bytes2:
-                    frame2 = np.frombuffer(bytes2, np.uint8).reshape((height, width, 3))
-                    self.im2.set_data(frame2)
-                    self.cameras[1]['frame_count'] += 1
-                    self.update_fps(1)
+                updated = False
+                for i, cam in enumerate(self.cameras):
+                    if cam["restart"]:
+                        with tracer.span("restart", cam=cam["name"]):
+                            self.restart_camera(i)
+                    if cam["decoder"] is None:
+                        continue
+                    n = cam["frame_count"]
+                    # Kısa son tarih: bir kameranın takılması diğerini bekletmez
+                    try:
+                        # Çözücü arka ucu okumayı ve NumPy dönüşümünü birlikte yapar
+                        with tracer.span("read", cam=cam["name"], frame=n):
+                            result = cam["decoder"].read(timeout=READ_TIMEOUT)
+                    except ReadTimeout:
+                        continue
+                    if result:
+                        cam["frame"], cam["pts"] = result
+                        cam['frame_count'] += 1
+                        self.update_fps(i)
+                        with tracer.span("watchdog", cam=cam["name"], frame=n):
+                            self.watchdog.feed(cam["name"], cam["frame"])
+                        # Katmanlar kareye yakılmadan önce arşive verilir
+                        if self.timelapse:
+                            with tracer.span("timelapse", cam=cam["name"], frame=n):
+                                self.timelapse.offer(cam["name"], cam["frame"])
+                        quality = f"Kalite seviyesi {cam['level']}" if cam["level"] else None
+                        with tracer.span("overlay", cam=cam["name"], frame=n):
+                            frame = cam["overlay"].apply(cam["frame"], fps=cam["fps"], extra=quality)
+                        with tracer.span("set_data", cam=cam["name"], frame=n):
+                            images[i].set_data(frame)
+                        updated = True
                 
-                self.fig.canvas.draw()
-                self.fig.canvas.flush_events()
+                if updated:
+                    with tracer.span("draw"):
+                        self.fig.canvas.draw()
+                        self.fig.canvas.flush_events()
                 time.sleep(0.01)
                 
             except Exception as e:
+                # Döngüden yalnızca stop_stream ile çıkılır; yeniden başlatma ve kalite
+                # değişiklikleri bu döngüde uygulandığından hata sonrası devam edilir
                 if self.is_running:
                     self.update_info(f"Görüntü alma hatası: {str(e)}")
-                break
+                    time.sleep(0.1)
 
     def stop_stream(self):
         """Akışı durdur ve kaynakları temizle"""
@@ -221,14 +344,49 @@ class DualRTSPViewer:
         self.btn.label.set_text("Başlat")
         self.update_info("Akış durduruldu")
         
+        self.watchdog.stop()
+        self.scheduler.stop()
+        self.close_decoders()
+        if self.timelapse:
+            self.timelapse.close()
+            self.timelapse = None
+        if self.tracer.enabled:
+            self.tracer.disable()
+            self.export_trace()
+
+    def on_frozen(self, name, reason):
+        """Gözetleyici donmuş akış bildirdi; okuma thread'i kamerayı yeniden başlatır"""
+        for cam in self.cameras:
+            if cam["name"] == name:
+                cam["restart"] = True
+                self.update_info(f"{name} donmuş ({reason}), yeniden bağlanıyor...")
+
+    def restart_camera(self, cam_index):
+        """Kameranın çözücüsünü kapatıp yeniden aç"""
+        cam = self.cameras[cam_index]
+        cam["restart"] = False
+        if cam["decoder"]:
+            try:
+                cam["decoder"].close()
+            except:
+                pass
+            cam["decoder"] = None
+        try:
+            cam["decoder"] = self.open_decoder(cam)
+        except Exception as e:
+            self.update_info(f"{cam['name']} yeniden bağlanamadı: {str(e)}")
+        # Başarısız olsa bile sayaçlar sıfırlanır; gözetleyici süre dolunca yeniden dener
+        self.watchdog.register(cam["name"])
+
+    def close_decoders(self):
+        """Açık çözücü arka uçlarını kapat"""
         for cam in self.cameras:
-            if cam["process"]:
+            if cam["decoder"]:
                 try:
-                    cam["process"].terminate()
-                    cam["process"].wait(timeout=1)
-                    cam["process"] = None
+                    cam["decoder"].close()
                 except:
                     pass
+                cam["decoder"] = None
 
     def on_close(self, event):
         """Pencere kapatıldığında temizlik yap"""
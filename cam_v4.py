@@ -1,4 +1,3 @@
-import ffmpeg
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Button
@@ -6,12 +5,26 @@ import threading
 import time
 import tkinter as tk
 from tkinter import simpledialog
+from decoders import create_backend
+from stream_watchdog import FrozenStreamWatchdog, ReadTimeout
+from frame_trace import FrameTracer
 
 class StableRTSPViewer:
     def __init__(self):
-        self.process = None
+        self.decoder = None
+        self.backend_name = "ffmpeg"  # veya "pyav" (süreç içi libav)
         self.rtsp_url = ""
         self.is_running = False
+        # Donmuş akış bu kadar saniyede algılanır ve yeniden bağlanılır
+        self.freeze_timeout = 5.0
+        self.restart_requested = False
+        # Kapanıp hemen yeniden düşen kameralar için yeniden bağlanmalar arası en az süre
+        self.restart_delay = 2.0
+        self.last_restart = 0.0
+        self.watchdog = FrozenStreamWatchdog(self.freeze_timeout, on_frozen=self.on_frozen)
+        # Kare aşamalarının zaman çizelgesi: 't' tuşu ya da RTSP_TRACE=1 ile açılır
+        self.tracer = FrameTracer()
+        self.frame_number = 0
         self.fig = None
         self.setup_ui()
 
@@ -33,9 +46,29 @@ class StableRTSPViewer:
         self.connect_btn = Button(self.connect_btn_ax, 'BAĞLAN', color='lightgreen')
         self.connect_btn.on_clicked(self.toggle_stream)
         
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key_press)
+        
         # Pencere kapatma olayı
         self.fig.canvas.mpl_connect('close_event', self.on_close)
 
+    def on_key_press(self, event):
+        if event.key == 't':
+            self.toggle_trace()
+
+    def toggle_trace(self):
+        """İzlemeyi aç/kapat; kapatırken kayıt JSON olarak dışa aktarılır"""
+        if self.tracer.toggle():
+            print("Kare izleme açık - kapatmak ve kaydetmek için 't'")
+        else:
+            self.export_trace()
+
+    def export_trace(self):
+        try:
+            path = self.tracer.export_chrome_trace()
+            print(f"İzleme kaydedildi: {path} (ui.perfetto.dev ile açın)")
+        except Exception as e:
+            print(f"İzleme kaydedilemedi: {e}")
+
     def change_url(self, event):
         root = tk.Tk()
         root.withdraw()
@@ -67,22 +100,9 @@ class StableRTSPViewer:
         self.connect_btn.label.set_text("DURDUR")
         
         try:
-            # Daha stabil FFmpeg parametreleri
-            self.process = (
-                ffmpeg
-                .input(self.rtsp_url, 
-                      rtsp_transport='tcp',
-                      timeout='5000000',
-                      fflags='nobuffer',
-                      flags='low_delay')
-                .output('pipe:',
-                       format='rawvideo',
-                       pix_fmt='rgb24',
-                       s='1280x720',
-                       r='25',  # FPS
-                       threads='2')
-                .run_async(pipe_stdout=True)
-            )
+            self.decoder = self.open_decoder()
+            self.watchdog.register("kamera")
+            self.watchdog.start()
             
             self.stream_thread = threading.Thread(target=self.update_frame)
             self.stream_thread.daemon = True
@@ -93,25 +113,75 @@ class StableRTSPViewer:
             self.is_running = False
             self.connect_btn.label.set_text("BAĞLAN")
 
+    def open_decoder(self):
+        # Daha stabil çözücü parametreleri (düşük gecikme, 25 FPS, 2 thread)
+        return create_backend(
+            self.backend_name,
+            self.rtsp_url,
+            1280, 720,
+            fps=25,
+            threads=2,
+            low_delay=True
+        )
+
+    def on_frozen(self, name, reason):
+        print(f"Donmuş akış: {reason}, yeniden bağlanıyor")
+        self.restart_requested = True
+
+    def restart_decoder(self):
+        self.restart_requested = False
+        self.last_restart = time.monotonic()
+        if self.decoder:
+            self.decoder.close()
+            self.decoder = None
+        try:
+            self.decoder = self.open_decoder()
+        except Exception as e:
+            print(f"Yeniden bağlanma hatası: {e}")
+        # Başarısız olsa bile gözetleyici süre dolunca yeniden dener
+        self.watchdog.register("kamera")
+
     def update_frame(self):
-        width, height = 1280, 720
-        
+        tracer = self.tracer
         while self.is_running:
             try:
-                in_bytes = self.process.stdout.read(width * height * 3)
-                if not in_bytes:
-                    print("Akış sonlandı: Veri alınamıyor")
-                    break
+                if self.restart_requested and time.monotonic() - self.last_restart >= self.restart_delay:
+                    with tracer.span("restart"):
+                        self.restart_decoder()
+                if self.decoder is None:
+                    time.sleep(0.1)
+                    continue
+                n = self.frame_number
+                try:
+                    # Çözücü arka ucu okumayı ve NumPy dönüşümünü birlikte yapar
+                    with tracer.span("read", frame=n):
+                        result = self.decoder.read(timeout=1.0)
+                except ReadTimeout:
+                    tracer.instant("read_timeout", frame=n)
+                    continue
+                if result is None:
+                    # ffmpeg kapandı (ör. 5 sn zaman aşımı): donma gibi yeniden bağlanılır
+                    print(f"Akış sonlandı, yeniden bağlanıyor: {self.decoder.last_error}")
+                    self.decoder.close()
+                    self.decoder = None
+                    self.restart_requested = True
+                    continue
                     
-                frame = np.frombuffer(in_bytes, np.uint8).reshape((height, width, 3))
-                self.im.set_data(frame)
-                self.fig.canvas.draw()
-                self.fig.canvas.flush_events()
+                frame, pts = result
+                self.frame_number += 1
+                with tracer.span("watchdog", frame=n):
+                    self.watchdog.feed("kamera", frame)
+                with tracer.span("set_data", frame=n):
+                    self.im.set_data(frame)
+                with tracer.span("draw", frame=n):
+                    self.fig.canvas.draw()
+                    self.fig.canvas.flush_events()
                 
             except Exception as e:
+                # Döngüden yalnızca stop_stream ile çıkılır
                 if self.is_running:  # Beklenmeyen hataları logla
                     print(f"Görüntü işleme hatası: {e}")
-                break
+                    time.sleep(0.1)
 
     def stop_stream(self):
         if not self.is_running:
@@ -119,18 +189,18 @@ class StableRTSPViewer:
             
         self.is_running = False
         self.connect_btn.label.set_text("BAĞLAN")
+        self.watchdog.stop()
+        if self.tracer.enabled:
+            self.tracer.disable()
+            self.export_trace()
         
-        if self.process:
+        if self.decoder:
             try:
-                self.process.stdin.close() if self.process.stdin else None
-                self.process.stdout.close() if self.process.stdout else None
-                self.process.stderr.close() if self.process.stderr else None
-                self.process.terminate()
-                self.process.wait(timeout=1)
+                self.decoder.close()
             except Exception as e:
                 print(f"Durdurma hatası: {e}")
             finally:
-                self.process = None
+                self.decoder = None
 
     def on_close(self, event):
         self.stop_stream()
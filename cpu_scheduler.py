@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # psutil isteğe bağlı; Linux'ta /proc kullanılır
+    psutil = None
+
+# Kalite basamakları: 0 tam kalite, sonrakiler giderek daha ucuz
+QUALITY_LEVELS = [
+    {"fps": None, "size": (1280, 720), "threads": None, "skip_frame": None},
+    {"fps": 15, "size": (1280, 720), "threads": 2, "skip_frame": None},
+    {"fps": 10, "size": (960, 540), "threads": 1, "skip_frame": None},
+    {"fps": 5, "size": (640, 360), "threads": 1, "skip_frame": None},
+    {"fps": None, "size": (640, 360), "threads": 1, "skip_frame": "nokey"},  # yalnızca anahtar kareler
+]
+
+# Ölçülen süreç kapanmış olabilir
+PROCESS_ERRORS = (OSError, ValueError) + ((psutil.Error,) if psutil is not None else ())
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2  # öncelikli kameraların kalitesi hiç düşürülmez
+PRIORITY_NAMES = {PRIORITY_LOW: "düşük", PRIORITY_NORMAL: "normal", PRIORITY_HIGH: "öncelikli"}
+
+
+class CpuSampler:
+    """Toplam ve süreç başına CPU kullanımını yüzde olarak ölçer"""
+
+    def __init__(self):
+        self.last_total = None
+        self.last_pids = {}
+        self.processes = {}
+        self.has_proc = os.path.exists('/proc/stat')
+        self.clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+    @property
+    def available(self):
+        return psutil is not None or self.has_proc
+
+    def total_percent(self):
+        """Son çağrıdan bu yana sistem geneli CPU yüzdesi; ölçülemiyorsa None"""
+        if psutil is not None:
+            return psutil.cpu_percent(interval=None)
+        if not self.has_proc:
+            return None
+        with open('/proc/stat') as f:
+            values = [int(v) for v in f.readline().split()[1:]]
+        total, idle = sum(values), values[3] + values[4]
+        last, self.last_total = self.last_total, (total, idle)
+        if last is None or total == last[0]:
+            return 0.0
+        return 100.0 * (1.0 - (idle - last[1]) / (total - last[0]))
+
+    def process_percent(self, pid):
+        """Sürecin tek çekirdeğe göre CPU yüzdesi (çok thread'de 100'ü aşabilir)"""
+        if pid is None:
+            return 0.0
+        try:
+            if psutil is not None:
+                if pid not in self.processes:
+                    self.processes[pid] = psutil.Process(pid)
+                return self.processes[pid].cpu_percent(interval=None)
+            if not self.has_proc:
+                return 0.0
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except PROCESS_ERRORS:
+            self.processes.pop(pid, None)
+            return 0.0
+        cpu_time = (int(fields[11]) + int(fields[12])) / self.clock_ticks
+        now = time.monotonic()
+        last, self.last_pids[pid] = self.last_pids.get(pid), (now, cpu_time)
+        if last is None or now == last[0]:
+            return 0.0
+        return 100.0 * (cpu_time - last[1]) / (now - last[0])
+
+
+class CpuBudgetScheduler:
+    """Toplam CPU bütçe aşılınca önce düşük öncelikli kameraların kalitesini düşürür,
+    boş kapasite geri geldiğinde önce öncelikli kameraları geri yükseltir"""
+
+    def __init__(self, apply_level, budget=80.0, headroom=20.0, interval=2.0,
+                 restore_after=3, levels=QUALITY_LEVELS):
+        # apply_level(name, level_index, level) kalite değişimini kameraya uygular
+        self.apply_level = apply_level
+        self.budget = budget
+        self.headroom = headroom
+        self.interval = interval
+        self.restore_after = restore_after
+        self.levels = levels
+        self.sampler = CpuSampler()
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.calm_ticks = 0
+        self.cooldown = 0
+        self.is_running = False
+        self.thread = None
+
+    def add_camera(self, name, priority=PRIORITY_NORMAL, get_pid=None):
+        """get_pid() kameranın çözücü sürecinin pid'ini döndürür (süreç içi çözücüde None)"""
+        with self.lock:
+            self.cameras[name] = {"priority": priority, "level": 0, "get_pid": get_pid, "cost": 0.0}
+
+    def set_priority(self, name, priority):
+        with self.lock:
+            self.cameras[name]["priority"] = priority
+        # Öncelikli yapılan kamera hemen tam kaliteye döner
+        if priority >= PRIORITY_HIGH:
+            self._change(name, 0)
+
+    def level(self, name):
+        with self.lock:
+            return self.cameras[name]["level"]
+
+    def _change(self, name, level):
+        with self.lock:
+            cam = self.cameras[name]
+            if cam["level"] == level:
+                return
+            cam["level"] = level
+        # Süreç yeniden başlarken oluşan CPU tepesi bir sonraki kararı etkilemesin
+        self.cooldown = 1
+        self.apply_level(name, level, self.levels[level])
+
+    def tick(self):
+        """Bir ölçüm ve en fazla bir kalite değişikliği yap"""
+        total = self.sampler.total_percent()
+        with self.lock:
+            for cam in self.cameras.values():
+                pid = cam["get_pid"]() if cam["get_pid"] else None
+                cam["cost"] = self.sampler.process_percent(pid)
+            snapshot = {name: dict(cam) for name, cam in self.cameras.items()}
+        if total is None:
+            return None
+        if self.cooldown:
+            self.cooldown -= 1
+            return None
+
+        if total > self.budget:
+            self.calm_ticks = 0
+            candidates = [
+                (cam["priority"], -cam["cost"], name)
+                for name, cam in snapshot.items()
+                if cam["priority"] < PRIORITY_HIGH and cam["level"] < len(self.levels) - 1
+            ]
+            if candidates:
+                _, _, name = min(candidates)
+                self._change(name, snapshot[name]["level"] + 1)
+                return name
+        elif total < self.budget - self.headroom:
+            self.calm_ticks += 1
+            if self.calm_ticks >= self.restore_after:
+                self.calm_ticks = 0
+                candidates = [
+                    (-cam["priority"], name)
+                    for name, cam in snapshot.items()
+                    if cam["level"] > 0
+                ]
+                if candidates:
+                    _, name = min(candidates)
+                    self._change(name, snapshot[name]["level"] - 1)
+                    return name
+        else:
+            self.calm_ticks = 0
+        return None
+
+    def start(self):
+        if self.is_running or not self.sampler.available:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.is_running:
+            time.sleep(self.interval)
+            if self.is_running:
+                self.tick()
+
+    def stop(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1)
+            self.thread = None
@@ -0,0 +1,251 @@
+import queue
+import threading
+from abc import ABC, abstractmethod
+import time
+import numpy as np
+import ffmpeg
+from ffmpeg_stats import PROGRESS_ARGS, StderrMonitor
+from stream_watchdog import DeadlineReader, ReadTimeout
+
+try:
+    import av
+except ImportError:  # PyAV isteğe bağlı
+    av = None
+
+
+def _rtsp_options(url):
+    """RTSP adresleri için ortak bağlantı seçenekleri"""
+    if url.startswith('rtsp://') or url.startswith('rtsps://'):
+        return {'rtsp_transport': 'tcp', 'timeout': '5000000'}
+    return {}
+
+
+def _set_low_delay(context):
+    """AV_CODEC_FLAG_LOW_DELAY bayrağını codec bağlamına ekle (PyAV sürümleri arasında ad farklı)"""
+    try:
+        from av.codec.context import Flags
+        context.flags |= getattr(Flags, 'low_delay', None) or Flags.LOW_DELAY
+    except (ImportError, AttributeError):
+        context.low_delay = True
+
+
+class DecoderBackend(ABC):
+    """Kod çözücü arka uçları için ortak arayüz; read() (NumPy kare, PTS saniye) döndürür.
+    cam_v3 ve cam_v4 bu arayüzü kullanır; cam_v1 (ROI kırpma filtresi, önce-bağlan-sonra-kes)
+    ve cam_v2 (split ile tek çözme, çok çıktı) ffmpeg filtre grafiğine doğrudan bağlıdır."""
+
+    name = ""
+    # True ise read()'in ikinci değeri akış PTS'i değil, ilk kareye göre varış zamanıdır
+    pts_is_arrival = False
+
+    def __init__(self, url, width, height, fps=None, threads=None, skip_frame=None,
+                 low_delay=False, input_format=None):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.threads = threads
+        self.skip_frame = skip_frame
+        self.low_delay = low_delay
+        self.input_format = input_format
+        self.last_error = ""
+
+    @abstractmethod
+    def open(self):
+        """Kaynağı aç ve çözmeye hazırla"""
+
+    @abstractmethod
+    def read(self, timeout=None):
+        """Sonraki kareyi (frame, pts) olarak döndür; akış bittiyse None, süre dolarsa ReadTimeout"""
+
+    @abstractmethod
+    def close(self):
+        """Süreci/kapsayıcıyı kapat"""
+
+    def summary(self):
+        return self.name
+
+
+class FfmpegPipeBackend(DecoderBackend):
+    """ffmpeg-python alt süreci ve rawvideo pipe'ı üzerinden çözme"""
+
+    name = "ffmpeg"
+    pts_is_arrival = True
+
+    def open(self):
+        input_kwargs = _rtsp_options(self.url)
+        if self.input_format:
+            input_kwargs['format'] = self.input_format
+        if self.skip_frame:
+            input_kwargs['skip_frame'] = self.skip_frame
+        if self.low_delay:
+            input_kwargs.update(fflags='nobuffer', flags='low_delay')
+
+        output_kwargs = {}
+        if self.fps:
+            output_kwargs['r'] = str(self.fps)
+        if self.threads:
+            output_kwargs['threads'] = str(self.threads)
+
+        self.frame_size = self.width * self.height * 3
+        self.process = (
+            ffmpeg
+            .input(self.url, **input_kwargs)
+            .output('pipe:', format='rawvideo', pix_fmt='rgb24', s=f'{self.width}x{self.height}', **output_kwargs)
+            .global_args(*PROGRESS_ARGS)
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        self.monitor = StderrMonitor(self.process, self.url)
+        self.reader = DeadlineReader(self.process.stdout)
+        self.start_time = None
+
+    def read(self, timeout=None):
+        buffer = self.reader.read_frame(self.frame_size, timeout)
+        if buffer is None:
+            self.last_error = self.monitor.snapshot()["last_error"]
+            return None
+        # rawvideo pipe paket zaman damgası taşımaz; ilk kareye göre varış zamanı kullanılır
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now
+        frame = np.frombuffer(buffer, np.uint8).reshape((self.height, self.width, 3))
+        return frame, now - self.start_time
+
+    def close(self):
+        if self.process:
+            try:
+                self.process.terminate()
+                self.process.wait(timeout=2)
+            except:
+                pass
+            self.monitor.join()
+            self.reader.close()
+            self.process = None
+
+    def summary(self):
+        return self.monitor.summary()
+
+
+class PyAVBackend(DecoderBackend):
+    """libav'ı süreç içinde PyAV ile kullanarak çözme; gerçek paket PTS değerlerini verir"""
+
+    name = "pyav"
+
+    def open(self):
+        if av is None:
+            raise RuntimeError("PyAV kurulu değil: pip install av")
+        options = _rtsp_options(self.url)
+        if self.low_delay:
+            # nobuffer bir biçim seçeneğidir; low_delay ise aşağıda codec bayrağı olarak verilir
+            options['fflags'] = 'nobuffer'
+        self.container = av.open(self.url, format=self.input_format, options=options, timeout=(5.0, 5.0))
+        stream = self.container.streams.video[0]
+        stream.thread_type = 'AUTO'
+        if self.threads:
+            stream.codec_context.thread_count = int(self.threads)
+        if self.skip_frame:
+            # ffmpeg'deki 'nokey' PyAV'da 'NONKEY' olarak adlandırılır
+            stream.codec_context.skip_frame = 'NONKEY' if self.skip_frame == 'nokey' else self.skip_frame.upper()
+        if self.low_delay:
+            _set_low_delay(stream.codec_context)
+        self.time_base = stream.time_base
+        self.frames = self.container.decode(stream)
+        self.min_interval = 1.0 / float(self.fps) if self.fps else 0.0
+        self.next_pts = None
+        self.decoded = 0
+        self.ended = False
+        # libav çağrıları bloklar; çözme kendi thread'inde yapılır, read() kuyruktan son tarihle alır
+        self.queue = queue.Queue(maxsize=2)
+        self.is_running = True
+        self.thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self.thread.start()
+
+    def _decode_loop(self):
+        try:
+            for frame in self.frames:
+                if not self.is_running:
+                    break
+                pts = float(frame.pts * self.time_base) if frame.pts is not None else None
+                # Kare hızı sınırı, dönüştürmeden önce kareyi atlayarak uygulanır
+                if pts is not None and self.min_interval and not self._keep_frame(pts):
+                    continue
+                self.decoded += 1
+                image = frame.to_ndarray(width=self.width, height=self.height, format='rgb24')
+                if not self._put((image, pts)):
+                    break
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            # Kapsayıcı onu kullanan thread'de kapatılır
+            try:
+                self.container.close()
+            except Exception:
+                pass
+            self._put(None)
+
+    def _keep_frame(self, pts):
+        """Kareyi tutma kararı; hedef zaman her tutulan karede sabit aralıkla ilerler.
+        Böylece ffmpeg -r gibi kaynak hızından bağımsız olarak ortalama tam fps elde edilir."""
+        eps = self.min_interval * 0.1  # float yuvarlama ve zaman damgası titremesi payı
+        if self.next_pts is None or pts < self.next_pts - self.min_interval - eps:
+            # İlk kare ya da geriye sıçrayan zaman damgası: yeniden eşitle
+            self.next_pts = pts + self.min_interval
+            return True
+        if pts < self.next_pts - eps:
+            return False
+        self.next_pts += self.min_interval
+        if pts >= self.next_pts:
+            # Akıştaki bir boşluktan sonra kaçırılan kareler telafi edilmez, yeniden eşitlenir
+            self.next_pts = pts + self.min_interval
+        return True
+
+    def _put(self, item):
+        """Kuyruk doluysa bekle (libav'a geri basınç); kapatılırsa False"""
+        while self.is_running:
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read(self, timeout=None):
+        if self.ended:
+            return None
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            raise ReadTimeout(f"{timeout:g} sn içinde kare gelmedi")
+        if item is None:
+            self.ended = True
+        return item
+
+    def close(self):
+        if getattr(self, 'thread', None):
+            self.is_running = False
+            # Ağ okumasında bekleyen thread av.open zaman aşımıyla çıkar; beklenmez
+            self.thread.join(timeout=0.5)
+            self.thread = None
+
+    def summary(self):
+        return f"PyAV | {self.decoded} kare"
+
+
+BACKENDS = {
+    "ffmpeg": FfmpegPipeBackend,
+    "pyav": PyAVBackend
+}
+
+
+def available_backends():
+    """Bu ortamda kullanılabilen arka uç adları"""
+    return [name for name in BACKENDS if name != "pyav" or av is not None]
+
+
+def create_backend(name, url, width, height, **options):
+    """Ada göre arka uç oluştur ve aç"""
+    if name not in BACKENDS:
+        raise ValueError(f"Bilinmeyen çözücü arka ucu: {name}")
+    backend = BACKENDS[name](url, width, height, **options)
+    backend.open()
+    return backend
@@ -0,0 +1,117 @@
+import re
+import threading
+import time
+from collections import deque
+
+# ffmpeg'in stderr'e makine tarafından okunabilir ilerleme blokları yazması için
+# global argümanlar. -nostats, satır sonu olmayan (\r) klasik istatistik satırını kapatır.
+PROGRESS_ARGS = ('-progress', 'pipe:2', '-nostats', '-loglevel', 'warning')
+
+# -progress çıktısında görülen anahtarlar
+PROGRESS_KEYS = {
+    'frame', 'fps', 'bitrate', 'total_size', 'out_time_us', 'out_time_ms',
+    'out_time', 'dup_frames', 'drop_frames', 'speed', 'progress'
+}
+PROGRESS_LINE = re.compile(r'^(\w+)=\s*(.*)$')
+ERROR_PATTERN = re.compile(
+    r'error|invalid|failed|timed out|refused|not found|unauthorized|corrupt',
+    re.IGNORECASE
+)
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value.rstrip('x'))
+    except (ValueError, AttributeError):
+        return default
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+class StderrMonitor:
+    """ffmpeg stderr akışını arka planda boşaltır ve çözücü istatistiklerini toplar"""
+
+    def __init__(self, process, name="", tail_size=50):
+        self.process = process
+        self.name = name
+        self.lock = threading.Lock()
+        self.stats = {
+            "fps": 0.0,
+            "speed": 0.0,
+            "frame": 0,
+            "drop_frames": 0,
+            "dup_frames": 0,
+            "errors": 0,
+            "ended": False,
+            "last_update": 0.0
+        }
+        # Günlük kuyruğu sınırlı tutulur, uzun akışlarda bellek büyümez
+        self.tail = deque(maxlen=tail_size)
+        self.last_error = ""
+        # process verilmezse satırlar dışarıdan parse_line ile beslenir (ör. asyncio motoru)
+        self.thread = None
+        if process is not None:
+            self.thread = threading.Thread(target=self._drain, daemon=True)
+            self.thread.start()
+
+    def _drain(self):
+        """stderr'i satır satır oku; pipe tamponu dolup ffmpeg'i durdurmasın"""
+        stream = self.process.stderr
+        if stream is None:
+            return
+        try:
+            for raw in iter(stream.readline, b''):
+                line = raw.decode('utf-8', errors='replace').strip()
+                if line:
+                    self.parse_line(line)
+        except (ValueError, OSError):
+            # Süreç kapatılırken pipe kapanmış olabilir
+            pass
+
+    def parse_line(self, line):
+        """Tek bir stderr satırını istatistiklere veya günlük kuyruğuna işle"""
+        match = PROGRESS_LINE.match(line)
+        if match and match.group(1) in PROGRESS_KEYS:
+            key, value = match.group(1), match.group(2)
+            with self.lock:
+                if key in ('fps', 'speed'):
+                    self.stats[key] = _to_float(value)
+                elif key in ('frame', 'drop_frames', 'dup_frames'):
+                    self.stats[key] = _to_int(value)
+                elif key == 'progress':
+                    self.stats["last_update"] = time.time()
+                    self.stats["ended"] = value == 'end'
+            return
+
+        with self.lock:
+            self.tail.append(line)
+            if ERROR_PATTERN.search(line):
+                self.stats["errors"] += 1
+                self.last_error = line
+
+    def snapshot(self):
+        """İstatistiklerin tutarlı bir kopyasını döndür"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["last_error"] = self.last_error
+        return stats
+
+    def log_tail(self):
+        """Son stderr satırlarını döndür"""
+        with self.lock:
+            return list(self.tail)
+
+    def summary(self):
+        """Başlıkta/bilgi panelinde gösterilecek kısa özet"""
+        s = self.snapshot()
+        return (f"Çözücü {s['fps']:.1f} FPS | Hız {s['speed']:.2f}x | "
+                f"Düşen {s['drop_frames']} | Çift {s['dup_frames']} | Hata {s['errors']}")
+
+    def join(self, timeout=1.0):
+        if self.thread:
+            self.thread.join(timeout=timeout)
@@ -0,0 +1,102 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+
+class FrameTimeline:
+    """Son N dakikanın düşük çözünürlüklü karelerini np.memmap halka dosyasında tutar"""
+
+    def __init__(self, path, width=320, height=180, minutes=5, sample_fps=2.0, queue_size=16):
+        self.width = width
+        self.height = height
+        self.capacity = max(1, int(minutes * 60 * sample_fps))
+        self.interval = 1.0 / sample_fps
+        self.lock = threading.Lock()
+        self.last_sample = 0.0
+        self.dropped = 0
+        self._index_cache = {}
+
+        frames_path, index_path = f"{path}.frames", f"{path}.index"
+        frames_size = self.capacity * height * width * 3
+        index_size = self.capacity * 8
+        # Boyutlar uyuyorsa önceki oturumun verisi korunur, uymuyorsa dosyalar yeniden oluşturulur
+        reuse = (
+            os.path.exists(frames_path) and os.path.getsize(frames_path) == frames_size and
+            os.path.exists(index_path) and os.path.getsize(index_path) == index_size
+        )
+        mode = 'r+' if reuse else 'w+'
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.frames = np.memmap(frames_path, dtype=np.uint8, mode=mode, shape=(self.capacity, height, width, 3))
+        # Zaman damgası dizini; 0 boş yuva demektir
+        self.index = np.memmap(index_path, dtype=np.float64, mode=mode, shape=(self.capacity,))
+        self.head = (int(np.argmax(self.index)) + 1) % self.capacity if self.index.any() else 0
+
+        # Disk yazımları yakalama thread'inden ayrı bir yazıcı thread'inde yapılır
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def _sample_indices(self, shape):
+        """Kaynak boyutuna göre seyreltme indekslerini bir kez hesapla"""
+        key = shape[:2]
+        if key not in self._index_cache:
+            rows = np.linspace(0, shape[0] - 1, self.height).astype(np.intp)
+            cols = np.linspace(0, shape[1] - 1, self.width).astype(np.intp)
+            self._index_cache[key] = (rows[:, None], cols[None, :])
+        return self._index_cache[key]
+
+    def append(self, frame, timestamp=None):
+        """Kareyi örnekleme aralığına göre kuyruğa ekle; kuyruk doluysa kare atlanır, asla beklemez"""
+        timestamp = time.time() if timestamp is None else timestamp
+        if timestamp - self.last_sample < self.interval:
+            return
+        self.last_sample = timestamp
+        rows, cols = self._sample_indices(frame.shape)
+        small = frame[rows, cols]  # gelişmiş indeksleme kopya üretir
+        try:
+            self.queue.put_nowait((timestamp, small))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            timestamp, small = item
+            with self.lock:
+                self.frames[self.head] = small
+                self.index[self.head] = timestamp
+                self.head = (self.head + 1) % self.capacity
+
+    def time_range(self):
+        """Kayıtlı en eski ve en yeni zaman damgası; kayıt yoksa None"""
+        with self.lock:
+            valid = self.index[self.index > 0]
+            if not valid.size:
+                return None
+            return float(valid.min()), float(valid.max())
+
+    def lookup(self, timestamp):
+        """Verilen ana en yakın önceki kareyi (zaman, kare) olarak döndür; çözme yapılmaz"""
+        with self.lock:
+            # head'den başlayarak döndürülen dizin kronolojik sıradadır
+            ordered = np.roll(np.asarray(self.index), -self.head)
+            valid = np.flatnonzero(ordered)
+            if not valid.size:
+                return None
+            start = valid[0]
+            pos = start + int(np.searchsorted(ordered[start:], timestamp, side='right')) - 1
+            slot = (max(pos, start) + self.head) % self.capacity
+            return float(self.index[slot]), np.array(self.frames[slot])
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join(timeout=2)
+        with self.lock:
+            self.frames.flush()
+            self.index.flush()
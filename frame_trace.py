@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# RTSP_TRACE=1 izlemeyi açık başlatır; RTSP_TRACE_SAMPLE_MS örnekleyici profil aralığıdır
+TRACE_ENV = "RTSP_TRACE"
+SAMPLE_ENV = "RTSP_TRACE_SAMPLE_MS"
+TRACE_DIR = "traces"
+
+
+class _NullSpan:
+    """İzleme kapalıyken dönen, hiçbir şey yapmayan aralık"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class FrameTracer:
+    """Her kamera ve her kare için aşama sürelerini halka tamponda tutar,
+    Chrome trace / Perfetto JSON olarak dışa aktarır"""
+
+    def __init__(self, enabled=None, capacity=200000, sample_ms=None):
+        if enabled is None:
+            enabled = os.environ.get(TRACE_ENV, "") not in ("", "0")
+        if sample_ms is None:
+            try:
+                sample_ms = float(os.environ.get(SAMPLE_ENV, 0) or 0)
+            except ValueError:
+                # Hatalı değer görüntüleyiciyi durdurmasın; profil kapalı kalır
+                sample_ms = 0.0
+        self.enabled = False
+        self.events = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+        self.sample_ms = sample_ms
+        self.sampler = None
+        if enabled:
+            self.enable()
+
+    def span(self, name, **args):
+        """with tracer.span("read", cam="Kamera 1", frame=n): ... ; kapalıyken maliyeti bir çağrıdır"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name, start_ns, end_ns, args=None, phase="X"):
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        with self.lock:
+            self.events.append((phase, name, tid, start_ns, end_ns, args))
+
+    def instant(self, name, **args):
+        """Süresiz olay (yeniden bağlanma, kalite değişimi vb.)"""
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self.record(name, now, now, args, phase="i")
+
+    def enable(self):
+        if self.enabled:
+            return
+        with self.lock:
+            self.events.clear()
+        self.enabled = True
+        if self.sample_ms > 0:
+            self.sampler = threading.Thread(target=self._sample, name="trace-sampler", daemon=True)
+            self.sampler.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.sampler:
+            self.sampler.join(timeout=1)
+            self.sampler = None
+
+    def toggle(self):
+        """Açıksa kapat, kapalıysa aç; yeni durumu döndür"""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def _sample(self):
+        """Örnekleyici profil: tüm thread'lerin yığınlarını aralıklarla anlık olay olarak kaydet.
+        GIL bekleyen thread'ler de görünür; aşama aralıklarıyla aynı zaman ekseninde incelenir."""
+        own = threading.get_ident()
+        interval = self.sample_ms / 1000.0
+        while self.enabled:
+            now = time.perf_counter_ns()
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < 32:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                with self.lock:
+                    self.events.append(("i", stack[0] if stack else "?", tid, now, now, {"stack": stack}))
+            time.sleep(interval)
+
+    def export_chrome_trace(self, path=None):
+        """Olayları chrome://tracing veya ui.perfetto.dev ile açılabilen JSON'a yaz; yolu döndür"""
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, time.strftime("trace_%Y%m%d_%H%M%S.json"))
+        with self.lock:
+            events = list(self.events)
+
+        pid = os.getpid()
+        names = dict(self.thread_names)
+        for thread in threading.enumerate():
+            names.setdefault(thread.ident, thread.name)
+        trace = [
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in names.items()
+        ]
+        for phase, name, tid, start_ns, end_ns, args in events:
+            event = {
+                "ph": phase, "name": name, "pid": pid, "tid": tid,
+                "ts": (start_ns - self.origin) / 1000.0
+            }
+            if phase == "X":
+                event["dur"] = (end_ns - start_ns) / 1000.0
+            else:
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            trace.append(event)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return path
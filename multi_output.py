@@ -0,0 +1,175 @@
+import os
+import subprocess
+import threading
+import numpy as np
+import ffmpeg
+from ffmpeg_stats import PROGRESS_ARGS, StderrMonitor
+from stream_watchdog import DeadlineReader, ReadTimeout
+from frame_trace import FrameTracer
+
+
+class MultiOutputStream:
+    """Kamerayı bir kez çözer, split filtresiyle birden çok çözünürlükte pipe üretir"""
+
+    def __init__(self, url, variants, name="", tracer=None):
+        # variants: {"main": (1280, 720), "inset": (640, 360)}; ilki stdout'a yazılır
+        self.url = url
+        self.variants = dict(variants)
+        self.name = name
+        # Pipe okuma ve NumPy dönüşümü okuyucu thread'lerinde izlenir
+        self.tracer = tracer or FrameTracer(enabled=False, sample_ms=0)
+        self.process = None
+        self.monitor = None
+        self.is_running = False
+        self.ended = False
+        self.condition = threading.Condition()
+        self.frames = {variant: (0, None) for variant in self.variants}
+        self.subscribers = {variant: [] for variant in self.variants}
+        self.threads = []
+
+    def start(self):
+        if self.is_running:
+            return
+        names = list(self.variants)
+        # Ek pipe'lar yalnızca POSIX'te alt sürece aktarılabilir (pass_fds);
+        # Windows'ta en büyük çıktı okunur, küçükler NumPy ile seyreltilir
+        self.use_fds = os.name == 'posix'
+        stream = ffmpeg.input(self.url, rtsp_transport='tcp', timeout=5000000)
+        pipes = {}
+
+        if self.use_fds:
+            split = stream.video.filter_multi_output('split', len(names))
+            outputs = []
+            for i, variant in enumerate(names):
+                width, height = self.variants[variant]
+                if i == 0:
+                    target = 'pipe:'
+                else:
+                    read_fd, write_fd = os.pipe()
+                    pipes[variant] = (read_fd, write_fd)
+                    target = f'pipe:{write_fd}'
+                outputs.append(
+                    split[i]
+                    .filter('scale', width, height)
+                    .output(target, format='rawvideo', pix_fmt='rgb24')
+                )
+            args = ffmpeg.merge_outputs(*outputs).global_args(*PROGRESS_ARGS).compile()
+        else:
+            width, height = self.variants[names[0]]
+            args = (
+                stream
+                .output('pipe:', format='rawvideo', pix_fmt='rgb24', s=f'{width}x{height}')
+                .global_args(*PROGRESS_ARGS)
+                .compile()
+            )
+
+        try:
+            self.process = subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                pass_fds=[w for _, w in pipes.values()]
+            )
+        finally:
+            # Yazma uçları artık yalnızca alt süreçte açık olmalı
+            for _, write_fd in pipes.values():
+                os.close(write_fd)
+
+        self.monitor = StderrMonitor(self.process, self.name)
+        self.is_running = True
+        self.ended = False
+        readers = {names[0]: self.process.stdout}
+        for variant, (read_fd, _) in pipes.items():
+            readers[variant] = os.fdopen(read_fd, 'rb')
+        # ffmpeg tüm çıktılar boşaltılmazsa durur; her çıktı kendi thread'inde okunur
+        self.threads = [
+            threading.Thread(target=self._read_output, args=(variant, pipe), daemon=True)
+            for variant, pipe in readers.items()
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _read_output(self, variant, pipe):
+        width, height = self.variants[variant]
+        frame_size = width * height * 3
+        derived = [] if self.use_fds else list(self.variants)[1:]
+        reader = DeadlineReader(pipe)
+        tracer = self.tracer
+        try:
+            while self.is_running:
+                # Kare numarası, görüntüleyicinin wait_for_frame ile aldığı sıra numarasıdır
+                n = self.frames[variant][0] + 1
+                # Her kare yeni, yazılabilir bir tampondur: aboneler saklayabilir ve üzerine çizebilir
+                try:
+                    with tracer.span("read", cam=self.name, variant=variant, frame=n):
+                        buffer = reader.read_frame(frame_size, timeout=1.0)
+                except ReadTimeout:
+                    continue
+                if buffer is None:
+                    break
+                with tracer.span("convert", cam=self.name, variant=variant, frame=n):
+                    frame = np.frombuffer(buffer, np.uint8).reshape((height, width, 3))
+                self._publish(variant, frame)
+                for small in derived:
+                    step = max(1, width // self.variants[small][0])
+                    # Görünüm değil kopya: ana kareye çizilen katman küçük çıktıya sızmasın
+                    self._publish(small, np.ascontiguousarray(frame[::step, ::step]))
+        except (ValueError, OSError):
+            pass
+        finally:
+            reader.close()
+            if pipe is not self.process.stdout:
+                pipe.close()
+            with self.condition:
+                self.ended = True
+                self.condition.notify_all()
+
+    def _publish(self, variant, frame):
+        # Aboneler kareyi görüntüleyici üzerine çizmeden önce görür: zaman çizelgesi ve
+        # gözetleyici katman yazısı içermeyen kareyi örnekler
+        for callback in list(self.subscribers[variant]):
+            callback(self.name, frame)
+        with self.condition:
+            seq = self.frames[variant][0] + 1
+            self.frames[variant] = (seq, frame)
+            self.condition.notify_all()
+
+    def subscribe(self, variant, callback):
+        """callback(name, frame) her yeni karede, kare latest()/wait_for_frame() ile
+        görünür olmadan önce okuyucu thread'inden çağrılır; kareyi saklayacaksa kopyalamalıdır"""
+        self.subscribers[variant].append(callback)
+
+    def unsubscribe(self, variant, callback):
+        if callback in self.subscribers[variant]:
+            self.subscribers[variant].remove(callback)
+
+    def latest(self, variant):
+        """(sıra no, kare) döndür; henüz kare yoksa kare None"""
+        with self.condition:
+            return self.frames[variant]
+
+    def wait_for_frame(self, variant, after_seq, timeout=None):
+        """after_seq'ten yeni bir kare gelene kadar bekle; zaman aşımı/bitişte None"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.frames[variant][0] > after_seq or self.ended,
+                timeout=timeout
+            )
+            if self.frames[variant][0] > after_seq:
+                return self.frames[variant]
+        return None
+
+    def stop(self):
+        if not self.is_running:
+            return
+        self.is_running = False
+        if self.process:
+            try:
+                self.process.terminate()
+                self.process.wait(timeout=2)
+            except:
+                pass
+        for thread in self.threads:
+            thread.join(timeout=1)
+        self.monitor.join()
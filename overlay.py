@@ -0,0 +1,137 @@
+import time
+import numpy as np
+from matplotlib import font_manager
+from matplotlib.ft2font import FT2Font
+
+DEFAULT_CHARSET = (
+    " !\"#%&'()*+,-./0123456789:;<=>?@"
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ[]_abcdefghijklmnopqrstuvwxyz|"
+    "ÇĞİÖŞÜçğıöşü"
+)
+
+
+class GlyphAtlas:
+    """Karakterleri bir kez sabit boyutlu hücrelere çizer; metinler dizi indekslemesiyle birleştirilir"""
+
+    def __init__(self, size=14, charset=DEFAULT_CHARSET, family='DejaVu Sans Mono', cache_size=256):
+        font = FT2Font(font_manager.findfont(family))
+        font.set_size(size, 72)
+        glyphs = []
+        for ch in charset:
+            font.set_text(ch, 0.0)
+            font.draw_glyphs_to_bitmap(antialiased=True)
+            image = np.asarray(font.get_image())
+            descent = font.get_descent() // 64
+            glyphs.append((image, image.shape[0] - descent, descent))
+
+        ascent = max(g[1] for g in glyphs)
+        height = ascent + max(g[2] for g in glyphs)
+        width = max(g[0].shape[1] for g in glyphs) + 1
+        # Hücreler taban çizgisine hizalanır, genişlikte ortalanır (eş aralıklı yazı tipi)
+        self.cells = np.zeros((len(charset), height, width), dtype=bool)
+        for i, (image, glyph_ascent, _) in enumerate(glyphs):
+            top = ascent - glyph_ascent
+            left = (width - image.shape[1]) // 2
+            self.cells[i, top:top + image.shape[0], left:left + image.shape[1]] = image > 96
+        self.cell_height, self.cell_width = height, width
+        self.lookup = {ch: i for i, ch in enumerate(charset)}
+        self.fallback = self.lookup.get('?', 0)
+        self.cache = {}
+        self.cache_size = cache_size
+
+    def render(self, text):
+        """Metnin (yükseklik, genişlik) boolean maskesini döndür"""
+        mask = self.cache.get(text)
+        if mask is None:
+            idx = np.fromiter((self.lookup.get(ch, self.fallback) for ch in text), dtype=np.intp, count=len(text))
+            # (n, h, w) -> (h, n*w): karakter hücreleri yan yana dizilir
+            mask = self.cells[idx].transpose(1, 0, 2).reshape(self.cell_height, -1)
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[text] = mask
+        return mask
+
+
+_default_atlas = None
+
+
+def default_atlas():
+    """Paylaşılan varsayılan glif atlası (ilk kullanımda oluşturulur)"""
+    global _default_atlas
+    if _default_atlas is None:
+        _default_atlas = GlyphAtlas()
+    return _default_atlas
+
+
+class FrameOverlay:
+    """Kamera adı, zaman, FPS ve hareket bölgelerini doğrudan kare tamponuna yakar"""
+
+    def __init__(self, label="", show_label=True, show_time=True, show_fps=True, zones=(),
+                 color=(255, 255, 255), zone_color=(255, 64, 64), atlas=None):
+        self.label = label
+        self.show_label = show_label
+        self.show_time = show_time
+        self.show_fps = show_fps
+        # Bölgeler karenin kesirleri olarak (x, y, genişlik, yükseklik)
+        self.zones = list(zones)
+        self.color = np.array(color, dtype=np.uint8)
+        self.zone_color = np.array(zone_color, dtype=np.uint8)
+        self.atlas = atlas
+        self.fps = 0.0
+        self.frame_count = 0
+        self.last_time = time.time()
+
+    def measure_fps(self):
+        """apply() çağrılarından FPS hesapla (0.5 saniyede bir güncellenir)"""
+        self.frame_count += 1
+        now = time.time()
+        if now - self.last_time > 0.5:
+            self.fps = self.frame_count / (now - self.last_time)
+            self.frame_count = 0
+            self.last_time = now
+        return self.fps
+
+    def apply(self, frame, fps=None, extra=None):
+        """Katmanları kareye yakar; kare salt okunursa kopyası üzerinde çalışır"""
+        if not frame.flags.writeable:
+            frame = frame.copy()
+        if self.atlas is None:
+            self.atlas = default_atlas()
+        fps = self.measure_fps() if fps is None else fps
+
+        for x, y, w, h in self.zones:
+            self.draw_rect(frame, x, y, w, h)
+
+        parts = []
+        if self.show_label and self.label:
+            parts.append(self.label)
+        if self.show_time:
+            parts.append(time.strftime('%H:%M:%S'))
+        if self.show_fps:
+            parts.append(f"{fps:.1f} FPS")
+        row = 4
+        for line in (" | ".join(parts), extra):
+            if line:
+                row += self.draw_text(frame, line, 4, row) + 2
+        return frame
+
+    def draw_text(self, frame, text, x, y):
+        """Metni koyu zemin üzerine yaz; çizilen satır yüksekliğini döndür"""
+        mask = self.atlas.render(text)
+        h = min(mask.shape[0], frame.shape[0] - y)
+        w = min(mask.shape[1], frame.shape[1] - x)
+        if h <= 0 or w <= 0:
+            return 0
+        region = frame[y:y + h, x:x + w]
+        np.right_shift(region, 1, out=region)  # okunabilirlik için zemini karart
+        region[mask[:h, :w]] = self.color
+        return h
+
+    def draw_rect(self, frame, x, y, w, h, thickness=2):
+        height, width = frame.shape[:2]
+        x0, y0 = int(x * width), int(y * height)
+        x1, y1 = min(int((x + w) * width), width), min(int((y + h) * height), height)
+        frame[y0:y0 + thickness, x0:x1] = self.zone_color
+        frame[max(y1 - thickness, 0):y1, x0:x1] = self.zone_color
+        frame[y0:y1, x0:x0 + thickness] = self.zone_color
+        frame[y0:y1, max(x1 - thickness, 0):x1] = self.zone_color
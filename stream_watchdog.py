@@ -0,0 +1,192 @@
+import os
+import queue
+import selectors
+import threading
+import time
+import numpy as np
+
+
+class ReadTimeout(TimeoutError):
+    """Son tarihe kadar tam bir kare okunamadı"""
+
+
+class DeadlineReader:
+    """Pipe'tan son tarihli, bloklamayan tam kare okuma (POSIX'te selector ile)"""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.buffer = None
+        self.received = 0
+        self.use_selector = os.name == 'posix'
+        if self.use_selector:
+            # Tamponlu okuyucu atlanır; pipe'tan daha önce okuma yapılmamış olmalı
+            self.raw = pipe.raw if hasattr(pipe, 'raw') else pipe
+            os.set_blocking(self.raw.fileno(), False)
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.raw, selectors.EVENT_READ)
+        else:
+            # Windows'ta pipe'lar select edilemez; okuma yardımcı thread'de yapılır
+            self.frames = queue.Queue(maxsize=2)
+            self.thread = None
+
+    def read_frame(self, size, timeout=None):
+        """size baytlık kareyi döndür; akış bittiyse None, süre dolarsa ReadTimeout.
+        Zaman aşımında yarım kalan kare saklanır, sonraki çağrı kaldığı yerden devam eder."""
+        if not self.use_selector:
+            return self._read_threaded(size, timeout)
+
+        if self.buffer is None or len(self.buffer) != size:
+            self.buffer = bytearray(size)
+            self.received = 0
+        view = memoryview(self.buffer)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self.received < size:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise ReadTimeout(f"{timeout:.1f} sn içinde kare gelmedi")
+            try:
+                ready = self.selector.select(remaining)
+            except (ValueError, OSError):
+                # Okuyucu başka bir thread'de kapatıldı
+                return None
+            if not ready:
+                continue
+            try:
+                count = self.raw.readinto(view[self.received:])
+            except BlockingIOError:
+                continue
+            except (ValueError, OSError):
+                return None
+            if count is None:
+                continue
+            if count == 0:
+                return None
+            self.received += count
+
+        frame, self.buffer, self.received = self.buffer, None, 0
+        return frame
+
+    def _read_threaded(self, size, timeout):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._pump, args=(size,), daemon=True)
+            self.thread.start()
+        try:
+            frame = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            raise ReadTimeout(f"{timeout:.1f} sn içinde kare gelmedi")
+        return frame
+
+    def _pump(self, size):
+        while True:
+            buffer = bytearray(size)
+            try:
+                count = self.pipe.readinto(buffer)
+            except (ValueError, OSError):
+                count = 0
+            if count < size:
+                self.frames.put(None)
+                return
+            self.frames.put(buffer)
+
+    def close(self):
+        if self.use_selector:
+            try:
+                self.selector.close()
+            except (ValueError, OSError):
+                pass
+
+
+class FrozenStreamWatchdog:
+    """Karesi gelmeyen ya da bayt bayt aynı kalan akışları işaretler"""
+
+    def __init__(self, freeze_timeout=5.0, on_frozen=None, sample_step=16):
+        self.freeze_timeout = freeze_timeout
+        self.on_frozen = on_frozen
+        self.sample_step = sample_step
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.is_running = False
+        self.thread = None
+
+    def register(self, name):
+        """Kamerayı izlemeye al (yeniden bağlanmada sayaçlar sıfırlanır)"""
+        now = time.monotonic()
+        with self.lock:
+            self.cameras[name] = {
+                "last_frame": now,
+                "last_change": now,
+                "sample": None,
+                "frame": None,
+                "frozen": False
+            }
+
+    def unregister(self, name):
+        with self.lock:
+            self.cameras.pop(name, None)
+
+    def feed(self, name, frame):
+        """Gelen kareyi kaydet; önce seyrek örnek, eşitse tüm kare karşılaştırılır.
+        Tam kopya yalnızca örnekler eşleşirken tutulur (kareler sonradan üzerine çizilebilir)."""
+        now = time.monotonic()
+        sample = frame[::self.sample_step, ::self.sample_step]
+        with self.lock:
+            cam = self.cameras.get(name)
+            if cam is None:
+                return
+            cam["last_frame"] = now
+            if cam["sample"] is None or not np.array_equal(sample, cam["sample"]):
+                identical = False
+                cam["frame"] = None
+            elif cam["frame"] is None:
+                # Örnek aynı; bir sonraki karede tam karşılaştırma için kopya al
+                identical = True
+                cam["frame"] = frame.copy()
+            else:
+                identical = cam["frame"].shape == frame.shape and np.array_equal(frame, cam["frame"])
+                if not identical:
+                    cam["frame"] = frame.copy()
+            if not identical:
+                cam["last_change"] = now
+                cam["frozen"] = False
+            cam["sample"] = sample.copy()
+
+    def check(self):
+        """Donmuş kameraları bul; her donma için on_frozen(name, neden) bir kez çağrılır"""
+        now = time.monotonic()
+        frozen = []
+        with self.lock:
+            for name, cam in self.cameras.items():
+                if cam["frozen"]:
+                    continue
+                if now - cam["last_frame"] > self.freeze_timeout:
+                    reason = f"{self.freeze_timeout:g} sn boyunca kare gelmedi"
+                elif now - cam["last_change"] > self.freeze_timeout:
+                    reason = f"{self.freeze_timeout:g} sn boyunca kareler aynı"
+                else:
+                    continue
+                cam["frozen"] = True
+                frozen.append((name, reason))
+        for name, reason in frozen:
+            if self.on_frozen:
+                self.on_frozen(name, reason)
+        return frozen
+
+    def start(self):
+        """Okuyucular bloklansa bile donmayı yakalayan denetim thread'ini başlat"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.is_running:
+            time.sleep(max(self.freeze_timeout / 4, 0.1))
+            self.check()
+
+    def stop(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join(timeout=self.freeze_timeout)
+            self.thread = None
@@ -0,0 +1,192 @@
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow isteğe bağlı; yoksa arşiv kapalı kalır
+    Image = None
+
+FORMATS = {"jpeg": "JPEG", "webp": "WEBP"}
+
+# Dizin kaydı: zaman damgası, .bin içindeki konum ve bayt uzunluğu
+INDEX_DTYPE = np.dtype([("ts", "<f8"), ("offset", "<u8"), ("length", "<u4")])
+
+
+def _day(ts):
+    return time.strftime("%Y-%m-%d", time.localtime(ts))
+
+
+def _camera_dir(root, cam):
+    return os.path.join(root, cam.replace(os.sep, "_"))
+
+
+class TimelapseWriter:
+    """Canlı okuyucudan gelen kareleri seyreltip iş havuzunda sıkıştırır,
+    kamera ve gün başına tek .bin kapsayıcısına toplu halde yazar"""
+
+    def __init__(self, root, interval=5.0, fmt="jpeg", quality=80, workers=2,
+                 batch_size=16, flush_interval=10.0, queue_size=8):
+        if Image is None:
+            raise RuntimeError("Pillow kurulu değil: pip install pillow")
+        if fmt not in FORMATS:
+            raise ValueError(f"Bilinmeyen biçim: {fmt}")
+        self.root = root
+        self.interval = interval
+        self.format = FORMATS[fmt]
+        self.quality = quality
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.last_offer = {}
+        self.written = 0
+        self.dropped = 0
+        # Sıkıştırılan ve henüz diske yazılmamış kare sınırı (geri basınç); bir toplu her zaman sığar
+        self.slots = threading.BoundedSemaphore(queue_size + batch_size)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="timelapse")
+        self.encoded = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="timelapse-writer", daemon=True)
+        self.writer.start()
+
+    def offer(self, cam, frame, ts=None):
+        """Kareyi aralık dolduysa arşive gönder; yer yoksa kare atlanır, canlı görüntü asla beklemez.
+        Kare kopyalanır, çağıran sonradan üzerine çizebilir."""
+        ts = time.time() if ts is None else ts
+        if ts - self.last_offer.get(cam, 0.0) < self.interval:
+            return False
+        if not self.slots.acquire(blocking=False):
+            self.dropped += 1
+            return False
+        self.last_offer[cam] = ts
+        try:
+            self.pool.submit(self._encode, cam, frame.copy(), ts)
+        except RuntimeError:
+            # Havuz kapatıldı
+            self.slots.release()
+            return False
+        return True
+
+    def _encode(self, cam, frame, ts):
+        try:
+            buffer = io.BytesIO()
+            Image.fromarray(frame).save(buffer, format=self.format, quality=self.quality)
+        except Exception:
+            self.slots.release()
+            self.dropped += 1
+            return
+        self.encoded.put((cam, ts, buffer.getvalue()))
+
+    def _write_loop(self):
+        batch = []
+        deadline = None
+        running = True
+        while running:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.encoded.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                running = False
+            elif item:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (not running or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                try:
+                    self._write_batch(batch)
+                except OSError:
+                    self.dropped += len(batch)
+                for _ in batch:
+                    self.slots.release()
+                batch, deadline = [], None
+
+    def _write_batch(self, batch):
+        groups = {}
+        for cam, ts, data in batch:
+            groups.setdefault((cam, _day(ts)), []).append((ts, data))
+        for (cam, day), items in groups.items():
+            items.sort(key=lambda item: item[0])
+            directory = _camera_dir(self.root, cam)
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, day)
+            records = np.zeros(len(items), dtype=INDEX_DTYPE)
+            # Önce veri, sonra dizin: yarıda kalan yazımda dizin olmayan veriyi göstermez
+            with open(base + ".bin", "ab") as f:
+                offset = f.tell()
+                for i, (ts, data) in enumerate(items):
+                    records[i] = (ts, offset, len(data))
+                    offset += len(data)
+                f.write(b"".join(data for _, data in items))
+            with open(base + ".idx", "ab") as f:
+                f.write(records.tobytes())
+            self.written += len(items)
+
+    def close(self):
+        """Bekleyen kareleri sıkıştır, son topluyu yaz ve thread'leri kapat"""
+        self.pool.shutdown(wait=True)
+        self.encoded.put(None)
+        self.writer.join(timeout=10)
+
+
+class TimelapseReader:
+    """Gün kapsayıcılarından zaman aralığına göre toplu okuma"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def cameras(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def days(self, cam):
+        directory = _camera_dir(self.root, cam)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".idx"))
+
+    def load_index(self, cam, day):
+        """Günün dizinini zamana göre sıralı döndür (yarım kalan son kayıt yok sayılır)"""
+        path = os.path.join(_camera_dir(self.root, cam), day + ".idx")
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        count = os.path.getsize(path) // INDEX_DTYPE.itemsize
+        index = np.fromfile(path, dtype=INDEX_DTYPE, count=count)
+        # Farklı işçilerden gelen kareler toplular arasında sırasız yazılmış olabilir
+        if count > 1 and np.any(np.diff(index["ts"]) < 0):
+            index = index[np.argsort(index["ts"], kind="stable")]
+        return index
+
+    def read_range(self, cam, t0, t1, decode=False):
+        """[t0, t1] aralığındaki kareleri (zaman, veri) listesi olarak döndür.
+        Her gün için ilgili bölüm tek seferde okunur; decode=True ise NumPy kareye çözülür."""
+        results = []
+        for day in self.days(cam):
+            if day < _day(t0) or day > _day(t1):
+                continue
+            index = self.load_index(cam, day)
+            lo = int(np.searchsorted(index["ts"], t0, side="left"))
+            hi = int(np.searchsorted(index["ts"], t1, side="right"))
+            selected = index[lo:hi]
+            if not selected.size:
+                continue
+            start = int(selected["offset"].min())
+            end = int((selected["offset"] + selected["length"]).max())
+            with open(os.path.join(_camera_dir(self.root, cam), day + ".bin"), "rb") as f:
+                f.seek(start)
+                chunk = memoryview(f.read(end - start))
+            for ts, offset, length in selected:
+                data = bytes(chunk[offset - start:offset - start + length])
+                results.append((float(ts), self.decode(data) if decode else data))
+        return results
+
+    @staticmethod
+    def decode(data):
+        if Image is None:
+            raise RuntimeError("Pillow kurulu değil: pip install pillow")
+        with Image.open(io.BytesIO(data)) as image:
+            return np.asarray(image.convert("RGB"))